@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # 共有キャッシュ（Redis）は任意の依存ライブラリ
+    redis = None
+
+# キャッシュの設定
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')  # 'memory'、'redis'、'none'
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))  # 保持するエントリ数の上限
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 256 * 1024 * 1024))  # 保持するレスポンスの合計バイト数の上限
+CACHE_MAX_ENTRY_BYTES = int(os.getenv('CACHE_MAX_ENTRY_BYTES', 8 * 1024 * 1024))  # 1エントリのバイト数の上限
+CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', 300))  # エントリの有効期間（秒）
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+CACHE_KEY_PREFIX = 'law-search:'
+
+
+class ResponseCache:
+    """
+    サイズ上限付きLRUとTTLでエントリを破棄する、プロセス内のレスポンスキャッシュ。
+
+    値はシリアライズ済みのレスポンス（バイト列）で保持し、エントリ数と合計バイト数のどちらかが上限を超えると
+    最も長く参照されていないエントリから破棄します。スレッドセーフです。
+    `RedisResponseCache` と同じく `get`、`set`、`clear` はコルーチンです（プロセス内の操作のため待機はしません）。
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 ttl_seconds=CACHE_TTL_SECONDS, max_entry_bytes=CACHE_MAX_ENTRY_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()  # キー → (有効期限, 値)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    async def get(self, key):
+        """
+        キャッシュからエントリを取得します。
+
+        :param key: キャッシュキー。
+        :return: キャッシュされた値。存在しない、または有効期限が切れている場合はNone。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self._counters['expirations'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return value
+
+    async def set(self, key, value):
+        """
+        キャッシュにエントリを保存します。上限を超えた場合は古いエントリから破棄します。
+
+        :param key: キャッシュキー。
+        :param value: 保存する値（バイト列）。
+        :return: None
+        """
+        if len(value) > self.max_entry_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._bytes += len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._counters['evictions'] += 1
+
+    async def clear(self):
+        """
+        すべてのエントリを破棄します。
+
+        :return: None
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._counters['invalidations'] += 1
+
+    def stats(self):
+        """
+        キャッシュのカウンタと使用量を返します。
+
+        :return: ヒット・ミス・破棄の回数、エントリ数、バイト数を含む辞書。
+        """
+        with self._lock:
+            return {
+                'backend': 'memory',
+                **self._counters,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds
+            }
+
+    async def close(self):
+        pass
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+class RedisResponseCache:
+    """
+    Redisを使用する共有レスポンスキャッシュ。複数のAPIレプリカでキャッシュを共有する場合に使用します。
+
+    エントリの破棄はRedisのTTLと `maxmemory-policy`（allkeys-lru など）に任せます。
+    `redis.asyncio` のクライアントを使用するため、Redisとの通信中もイベントループを止めません。
+    """
+
+    def __init__(self, url=CACHE_REDIS_URL, ttl_seconds=CACHE_TTL_SECONDS, max_entry_bytes=CACHE_MAX_ENTRY_BYTES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_entry_bytes
+        self._client = redis.Redis.from_url(url)
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    async def get(self, key):
+        """
+        Redisからエントリを取得します。
+
+        :param key: キャッシュキー。
+        :return: キャッシュされた値。存在しない場合はNone。
+        """
+        value = await self._client.get(CACHE_KEY_PREFIX + key)
+        with self._lock:
+            self._counters['hits' if value is not None else 'misses'] += 1
+        return value
+
+    async def set(self, key, value):
+        """
+        RedisにTTL付きでエントリを保存します。
+
+        :param key: キャッシュキー。
+        :param value: 保存する値（バイト列）。
+        :return: None
+        """
+        if len(value) > self.max_entry_bytes:
+            return
+        await self._client.set(CACHE_KEY_PREFIX + key, value, px=int(self.ttl_seconds * 1000))
+
+    async def clear(self):
+        """
+        このキャッシュのプレフィックスを持つすべてのエントリを削除します。
+
+        :return: None
+        """
+        keys = [key async for key in self._client.scan_iter(match=CACHE_KEY_PREFIX + '*', count=1000)]
+        if keys:
+            await self._client.delete(*keys)
+        with self._lock:
+            self._counters['invalidations'] += 1
+
+    def stats(self):
+        """
+        このプロセスで計測したヒット・ミスの回数を返します。
+
+        :return: カウンタを含む辞書。
+        """
+        with self._lock:
+            return {'backend': 'redis', **self._counters, 'ttl_seconds': self.ttl_seconds}
+
+    async def close(self):
+        """
+        Redisの接続を閉じます。
+
+        :return: None
+        """
+        await self._client.aclose()
+
+
+class NullCache:
+    """
+    キャッシュを無効にする場合に使用する、何も保存しないキャッシュ。
+    """
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value):
+        pass
+
+    async def clear(self):
+        pass
+
+    def stats(self):
+        return {'backend': 'none'}
+
+    async def close(self):
+        pass
+
+
+def create_cache(backend=CACHE_BACKEND):
+    """
+    設定に応じたレスポンスキャッシュを作成します。
+
+    'redis' が指定されていても `redis` がインストールされていない場合はプロセス内キャッシュを使用します。
+
+    :param backend: 'memory'、'redis'、'none' のいずれか。
+    :return: コルーチンの `get`、`set`、`clear`、`close` と `stats` を持つキャッシュオブジェクト。
+    """
+    if backend == 'none':
+        return NullCache()
+    if backend == 'redis':
+        if redis is not None:
+            return RedisResponseCache()
+        logging.warning("redisがインストールされていないため、プロセス内キャッシュを使用します")
+    return ResponseCache()
+
+
+def normalize_query(query):
+    """
+    キャッシュキー用に検索クエリを正規化します（NFKC正規化、空白の統一、英字の小文字化）。
+
+    :param query: 検索クエリ文字列。
+    :return: 正規化されたクエリ文字列。
+    """
+    return " ".join(unicodedata.normalize('NFKC', query).lower().split())
+
+
+def make_cache_key(endpoint, **params):
+    """
+    エンドポイントとパラメータからキャッシュキーを作成します。検索クエリは呼び出し側で `normalize_query` により正規化してください。
+
+    :param endpoint: エンドポイントの名前。
+    :param params: レスポンスに影響するパラメータ。
+    :return: キャッシュキーの文字列。
+    """
+    return json.dumps([endpoint, sorted(params.items())], ensure_ascii=False)
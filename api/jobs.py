@@ -0,0 +1,325 @@
+import os
+import asyncio
+import json
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# インデックスジョブの設定
+INDEX_JOB_CONCURRENCY = int(os.getenv('INDEX_JOB_CONCURRENCY', 4))  # 同時に処理するパーティション数
+INDEX_JOB_MAX_RETRIES = int(os.getenv('INDEX_JOB_MAX_RETRIES', 3))  # 失敗したパーティションを再試行する回数
+INDEX_JOB_RETRY_BACKOFF_SECONDS = float(os.getenv('INDEX_JOB_RETRY_BACKOFF_SECONDS', 2))  # 再試行までの待機時間の基準（秒）
+INDEX_JOB_RETRY_BACKOFF_MAX_SECONDS = 60  # 再試行までの待機時間の上限（秒）
+INDEX_JOB_HEARTBEAT_SECONDS = float(os.getenv('INDEX_JOB_HEARTBEAT_SECONDS', 30))  # 実行中のジョブが生存を記録する間隔（秒）
+INDEX_JOB_STALE_SECONDS = float(os.getenv('INDEX_JOB_STALE_SECONDS', 120))  # 生存の記録がこれより古い実行中のジョブは中断されたものとみなす（秒）
+
+
+async def create_index_job(jobs_collection, partitions, concurrency=INDEX_JOB_CONCURRENCY, options=None):
+    """
+    インデックスジョブを `index_jobs` コレクションに登録します。
+
+    :param jobs_collection: ジョブを保存するMongoDBのコレクション。
+    :param partitions: 'payload'（lambda_indexに渡すイベント）と 'count'（ドキュメント数）を含む辞書のリスト。
+    :param concurrency: 同時に処理するパーティション数。
+    :param options: ジョブに記録するその他の情報（incremental、granularityなど）。
+    :return: 登録したジョブのドキュメント。
+    """
+    now = datetime.now(timezone.utc)
+    job = {
+        '_id': uuid.uuid4().hex,
+        'status': 'pending',
+        'concurrency': concurrency,
+        'options': options or {},
+        'docs_total': sum(partition['count'] for partition in partitions),
+        'partitions': [
+            {
+                'payload': partition['payload'],
+                'count': partition['count'],
+                'status': 'pending',
+                'attempts': 0,
+                'error': None
+            }
+            for partition in partitions
+        ],
+        'created_at': now,
+        'heartbeat_at': now,
+        'started_at': None,
+        'finished_at': None
+    }
+    await jobs_collection.insert_one(job)
+    return job
+
+
+async def run_index_job(jobs_collection, job, invoke, on_finished=None):
+    """
+    インデックスジョブのパーティションを、最大 `concurrency` 件ずつ並行して処理します。
+
+    失敗したパーティションは指数バックオフ（ジッター付き）で最大 `INDEX_JOB_MAX_RETRIES` 回再試行し、
+    各パーティションの状態は処理のたびに `index_jobs` コレクションに記録します。
+    実行中は `INDEX_JOB_HEARTBEAT_SECONDS` ごとに `heartbeat_at` を更新し、プロセスが終了した場合は `fail_stale_index_jobs` が検出できるようにします。
+
+    :param jobs_collection: ジョブを保存するMongoDBのコレクション。
+    :param job: `create_index_job` が返したジョブのドキュメント。
+    :param invoke: lambda_indexのイベントを受け取り、失敗時に例外を送出するコルーチン関数。
+    :param on_finished: ジョブの完了時に呼び出すコルーチン関数（オプション）。
+    :return: ジョブの最終的なステータス。
+    """
+    job_id = job['_id']
+    now = datetime.now(timezone.utc)
+    await jobs_collection.update_one(
+        {'_id': job_id},
+        {'$set': {'status': 'running', 'started_at': now, 'heartbeat_at': now}}
+    )
+    semaphore = asyncio.Semaphore(max(job['concurrency'], 1))
+    heartbeat = asyncio.create_task(record_heartbeat(jobs_collection, job_id))
+
+    async def run_partition(number, partition):
+        async with semaphore:
+            return await run_index_partition(jobs_collection, job_id, number, partition['payload'], invoke)
+
+    try:
+        results = await asyncio.gather(*[
+            run_partition(number, partition) for number, partition in enumerate(job['partitions'])
+        ])
+        status = 'completed' if all(results) else 'completed_with_errors'
+    except Exception as e:
+        logging.error(f"インデックスジョブの実行中のエラー: {job_id} {e}")
+        status = 'failed'
+    finally:
+        heartbeat.cancel()
+
+    await jobs_collection.update_one(
+        {'_id': job_id},
+        {'$set': {'status': status, 'finished_at': datetime.now(timezone.utc)}}
+    )
+    logging.info(f"インデックスジョブが完了しました: {job_id} status={status}")
+    if on_finished is not None:
+        await on_finished()
+    return status
+
+
+async def record_heartbeat(jobs_collection, job_id):
+    """
+    ジョブの実行中、`INDEX_JOB_HEARTBEAT_SECONDS` ごとに `heartbeat_at` を更新します（キャンセルされるまで続けます）。
+
+    :param jobs_collection: ジョブを保存するMongoDBのコレクション。
+    :param job_id: ジョブID。
+    :return: None
+    """
+    while True:
+        await asyncio.sleep(INDEX_JOB_HEARTBEAT_SECONDS)
+        try:
+            await jobs_collection.update_one({'_id': job_id}, {'$set': {'heartbeat_at': datetime.now(timezone.utc)}})
+        except Exception as e:
+            logging.warning(f"インデックスジョブの生存を記録できませんでした: {job_id} {e}")
+
+
+async def fail_stale_index_jobs(jobs_collection):
+    """
+    実行中（'pending' または 'running'）のまま `INDEX_JOB_STALE_SECONDS` 以上 `heartbeat_at` が更新されていないジョブを、
+    APIのプロセスの終了により中断されたものとして失敗にします。
+
+    ワーカーの起動時に呼び出します。他のワーカーが実行中のジョブは `heartbeat_at` が更新され続けるため対象になりません。
+    完了していないパーティションは 'failed' にし、`/jobs/<job_id>` の `failed_partitions` から再実行する範囲を確認できるようにします。
+
+    :param jobs_collection: ジョブを保存するMongoDBのコレクション。
+    :return: 失敗にしたジョブの数。
+    """
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=INDEX_JOB_STALE_SECONDS)
+    stale_filter = {
+        'status': {'$in': ['pending', 'running']},
+        '$or': [{'heartbeat_at': {'$lt': cutoff}}, {'heartbeat_at': {'$exists': False}}]
+    }
+    failed = 0
+    try:
+        async for job in jobs_collection.find(stale_filter, {'partitions': 1}):
+            partitions = job.get('partitions', [])
+            for partition in partitions:
+                if partition['status'] not in ('done', 'failed'):
+                    partition['status'] = 'failed'
+                    partition['error'] = partition.get('error') or 'APIのプロセスが終了したため中断されました'
+                    partition['finished_at'] = now
+            # 判定後に他のワーカーが生存を記録した場合は更新しない
+            result = await jobs_collection.update_one(
+                {'_id': job['_id'], **stale_filter},
+                {'$set': {'status': 'failed', 'partitions': partitions, 'finished_at': now}}
+            )
+            if result.modified_count:
+                failed += 1
+                logging.warning(f"中断されたインデックスジョブを失敗にしました: {job['_id']}")
+    except Exception as e:
+        logging.error(f"中断されたインデックスジョブの確認中のエラー: {e}")
+    return failed
+
+
+async def run_index_partition(jobs_collection, job_id, number, payload, invoke):
+    """
+    1件のパーティションを処理し、失敗した場合はバックオフしながら再試行します。
+
+    :param jobs_collection: ジョブを保存するMongoDBのコレクション。
+    :param job_id: ジョブID。
+    :param number: パーティションの番号。
+    :param payload: lambda_indexに渡すイベント。
+    :param invoke: lambda_indexのイベントを受け取り、レスポンスを返すか、失敗時に例外を送出するコルーチン関数。
+    :return: 処理に成功した場合は真。
+    """
+    prefix = f'partitions.{number}'
+    for attempt in range(INDEX_JOB_MAX_RETRIES + 1):
+        await jobs_collection.update_one(
+            {'_id': job_id},
+            {'$set': {f'{prefix}.status': 'running', f'{prefix}.started_at': datetime.now(timezone.utc)},
+             '$inc': {f'{prefix}.attempts': 1}}
+        )
+        try:
+            result = await invoke(payload)
+            await jobs_collection.update_one(
+                {'_id': job_id},
+                {'$set': {f'{prefix}.status': 'done', f'{prefix}.error': None,
+                          f'{prefix}.metrics': partition_metrics(result),
+                          f'{prefix}.finished_at': datetime.now(timezone.utc)}}
+            )
+            return True
+        except Exception as e:
+            logging.warning(f"パーティションの処理に失敗しました: {job_id} #{number} (試行{attempt + 1}回目) {e}")
+            retrying = attempt < INDEX_JOB_MAX_RETRIES
+            await jobs_collection.update_one(
+                {'_id': job_id},
+                {'$set': {f'{prefix}.status': 'retrying' if retrying else 'failed', f'{prefix}.error': str(e),
+                          f'{prefix}.finished_at': None if retrying else datetime.now(timezone.utc)}}
+            )
+            if retrying:
+                delay = min(INDEX_JOB_RETRY_BACKOFF_SECONDS * 2 ** attempt, INDEX_JOB_RETRY_BACKOFF_MAX_SECONDS)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+    return False
+
+
+def summarize_job(job):
+    """
+    インデックスジョブの進捗（パーティションの状態ごとの件数、処理速度、残り時間の見込み）を集計します。
+
+    :param job: `index_jobs` コレクションのジョブのドキュメント。
+    :return: レスポンス用の辞書。
+    """
+    partitions = job.get('partitions', [])
+    counts = {'done': 0, 'failed': 0, 'running': 0, 'retrying': 0, 'pending': 0}
+    docs_done = 0
+    for partition in partitions:
+        counts[partition['status']] = counts.get(partition['status'], 0) + 1
+        if partition['status'] == 'done':
+            docs_done += partition.get('count', 0)
+
+    return {
+        'job_id': job['_id'],
+        'type': 'index',
+        'status': job['status'],
+        'partitions': {'total': len(partitions), **counts},
+        **progress_rates(job.get('docs_total', 0), docs_done, job.get('started_at'), job.get('finished_at')),
+        'phases': merge_phase_metrics(partition.get('metrics') for partition in partitions),
+        'failed_partitions': [
+            {'partition': number, 'gte': partition['payload'].get('gte'), 'lt': partition['payload'].get('lt'),
+             'attempts': partition.get('attempts'), 'error': partition.get('error')}
+            for number, partition in enumerate(partitions) if partition['status'] == 'failed'
+        ],
+        'options': job.get('options', {}),
+        'created_at': job.get('created_at'),
+        'started_at': job.get('started_at'),
+        'finished_at': job.get('finished_at')
+    }
+
+
+def summarize_run(run):
+    """
+    `/allindex` の実行（`index_runs` コレクション）の進捗を `summarize_job` と同じ形式で集計します。
+
+    :param run: `index_runs` コレクションの実行のドキュメント。
+    :return: レスポンス用の辞書。
+    """
+    total = run.get('total', 0)
+    failed = run.get('failed', 0)
+    done = run.get('done', 0) - failed
+    return {
+        'job_id': run['_id'],
+        'type': 'allindex',
+        'status': run.get('status'),
+        'partitions': {'total': total, 'done': done, 'failed': failed, 'running': 0, 'retrying': 0,
+                       'pending': total - done - failed},
+        **progress_rates(run.get('docs_total', 0), run.get('docs_done', 0), run.get('created_at'), run.get('finished_at')),
+        'failed_partitions': [
+            {'partition': int(number)} for number, status in (run.get('partitions') or {}).items() if status == 'failed'
+        ],
+        'options': {key: run.get(key) for key in ('incremental', 'granularity', 'bulk_load', 'force_merge_segments')},
+        'created_at': run.get('created_at'),
+        'started_at': run.get('created_at'),
+        'finished_at': run.get('finished_at')
+    }
+
+
+def partition_metrics(result):
+    """
+    lambda_indexのレスポンスから、段階ごとの処理時間（`metrics`）を取り出します。
+
+    :param result: lambda_indexのJSONレスポンス（'body' にJSON文字列を含む辞書）。
+    :return: 'total_sec' と 'phases' を含む辞書。含まれていない場合はNone。
+    """
+    body = result.get('body') if isinstance(result, dict) else None
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            return None
+    return body.get('metrics') if isinstance(body, dict) else None
+
+
+def merge_phase_metrics(metrics_list):
+    """
+    パーティションごとの処理時間を段階ごとに合算します。
+
+    :param metrics_list: `partition_metrics` の結果のイテラブル（Noneは無視します）。
+    :return: 段階をキー、'count'・'total_sec'・'max_sec' を値とする辞書。
+    """
+    phases = {}
+    for metrics in metrics_list:
+        for phase, stats in ((metrics or {}).get('phases') or {}).items():
+            merged = phases.setdefault(phase, {'count': 0, 'total_sec': 0.0, 'max_sec': 0.0})
+            merged['count'] += stats.get('count', 0)
+            merged['total_sec'] = round(merged['total_sec'] + stats.get('total_sec', 0.0), 3)
+            merged['max_sec'] = max(merged['max_sec'], stats.get('max_sec', 0.0))
+    return dict(sorted(phases.items()))
+
+
+def progress_rates(docs_total, docs_done, started_at, finished_at):
+    """
+    処理済みのドキュメント数と経過時間から、処理速度と残り時間の見込みを計算します。
+
+    :param docs_total: 対象のドキュメント数。
+    :param docs_done: 処理済みのドキュメント数。
+    :param started_at: 開始日時（Noneの場合は未開始）。
+    :param finished_at: 終了日時（Noneの場合は現在時刻までの経過時間を使用）。
+    :return: 'docs_total'、'docs_done'、'elapsed_sec'、'docs_per_sec'、'eta_sec' を含む辞書。
+    """
+    elapsed = None
+    if started_at is not None:
+        elapsed = max((as_utc(finished_at or datetime.now(timezone.utc)) - as_utc(started_at)).total_seconds(), 0.0)
+    docs_per_sec = docs_done / elapsed if elapsed else None
+    eta = None
+    if docs_per_sec and finished_at is None:
+        eta = round(max(docs_total - docs_done, 0) / docs_per_sec, 1)
+    return {
+        'docs_total': docs_total,
+        'docs_done': docs_done,
+        'elapsed_sec': round(elapsed, 1) if elapsed is not None else None,
+        'docs_per_sec': round(docs_per_sec, 2) if docs_per_sec else None,
+        'eta_sec': eta
+    }
+
+
+def as_utc(value):
+    """
+    MongoDBから取得したタイムゾーン情報の無い日時をUTCとして扱います。
+
+    :param value: 日時。
+    :return: タイムゾーン情報付きの日時。
+    """
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
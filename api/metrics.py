@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# メトリクスの設定
+METRICS_PREFIX = 'law_search_'
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # 処理時間（秒）のバケット
+
+
+class Counter:
+    """
+    ラベルごとに値を加算するカウンタ。スレッドセーフです。
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        カウンタを加算します。
+
+        :param amount: 加算する値。
+        :param labels: ラベルの値。
+        :return: None
+        """
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self, const_labels=()):
+        """
+        Prometheusのテキスト形式に変換します。
+
+        :param const_labels: すべての系列の先頭に付加する (ラベル名, 値) のタプル。
+        :return: 行のリスト。
+        """
+        const_names = tuple(name for name, _ in const_labels)
+        const_values = tuple(value for _, value in const_labels)
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{format_labels(const_names + self.labelnames, const_values + key)} {value}')
+        return lines
+
+
+class Histogram:
+    """
+    ラベルごとに観測値の分布（バケットごとの件数、合計、件数）を記録するヒストグラム。スレッドセーフです。
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # ラベル → [バケットごとの件数, 合計, 件数]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        観測値を記録します。
+
+        :param value: 観測値（秒）。
+        :param labels: ラベルの値。
+        :return: None
+        """
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self, const_labels=()):
+        """
+        Prometheusのテキスト形式に変換します。
+
+        :param const_labels: すべての系列の先頭に付加する (ラベル名, 値) のタプル。
+        :return: 行のリスト。
+        """
+        labelnames = tuple(name for name, _ in const_labels) + self.labelnames
+        const_values = tuple(value for _, value in const_labels)
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                key = const_values + key
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = format_labels(labelnames + ('le',), key + (repr(bound),))
+                    lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+                lines.append(f'{self.name}_bucket{format_labels(labelnames + ("le",), key + ("+Inf",))} {count}')
+                lines.append(f'{self.name}_sum{format_labels(labelnames, key)} {total}')
+                lines.append(f'{self.name}_count{format_labels(labelnames, key)} {count}')
+        return lines
+
+
+def format_labels(labelnames, values):
+    """
+    ラベルをPrometheusのテキスト形式に変換します。
+
+    :param labelnames: ラベル名のタプル。
+    :param values: ラベルの値のタプル。
+    :return: '{name="value",...}' 形式の文字列。ラベルが無い場合は空文字列。
+    """
+    if not labelnames:
+        return ''
+    pairs = []
+    for name, value in zip(labelnames, values):
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+# APIのメトリクス（ワーカープロセスごとに集計します）
+PHASE_SECONDS = Histogram(
+    f'{METRICS_PREFIX}phase_duration_seconds', 'Time spent in each phase of request handling.', ['phase']
+)
+PHASE_ERRORS = Counter(f'{METRICS_PREFIX}phase_errors_total', 'Number of phases that raised an exception.', ['phase'])
+REQUEST_SECONDS = Histogram(
+    f'{METRICS_PREFIX}http_request_duration_seconds', 'HTTP request latency by endpoint.', ['endpoint', 'method']
+)
+REQUESTS = Counter(f'{METRICS_PREFIX}http_requests_total', 'HTTP requests by endpoint and status.', ['endpoint', 'method', 'status'])
+
+
+@contextmanager
+def time_phase(phase):
+    """
+    ブロックの処理時間を `phase` のヒストグラムに記録するコンテキストマネージャ。例外が発生した場合はエラーのカウンタも加算します。
+
+    :param phase: 処理の段階の名前（'mongo_fetch'、'opensearch_search' など）。
+    :return: コンテキストマネージャ。
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        PHASE_ERRORS.inc(phase=phase)
+        raise
+    finally:
+        PHASE_SECONDS.observe(time.perf_counter() - start, phase=phase)
+
+
+def render_metrics(cache_stats=None):
+    """
+    すべてのメトリクスをPrometheusのテキスト形式（text/plain; version=0.0.4）に変換します。
+
+    メトリクスはワーカープロセスごとに集計されるため、すべての系列に `pid` ラベルを付加します。
+    どのワーカーがスクレイプに応答しても系列が混ざらず、Prometheus側で `sum without (pid)` などで合算できます。
+
+    :param cache_stats: レスポンスキャッシュの `stats()` の結果（オプション）。数値の項目をゲージとして出力します。
+    :return: レスポンスの本文。
+    """
+    const_labels = (('pid', str(os.getpid())),)
+    worker_labels = format_labels(('pid',), (str(os.getpid()),))
+    lines = []
+    for metric in (PHASE_SECONDS, PHASE_ERRORS, REQUEST_SECONDS, REQUESTS):
+        lines.extend(metric.render(const_labels))
+    for key, value in sorted((cache_stats or {}).items()):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            name = f'{METRICS_PREFIX}response_cache_{key}'
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name}{worker_labels} {value}')
+    lines.append(f'# TYPE {METRICS_PREFIX}worker_info gauge')
+    lines.append(f'{METRICS_PREFIX}worker_info{worker_labels} 1')
+    return '\n'.join(lines) + '\n'
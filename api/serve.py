@@ -0,0 +1,35 @@
+import os
+
+from hypercorn.config import Config
+from hypercorn.run import run
+
+# 本番用サーバー（Hypercorn）の設定
+API_BIND = os.getenv('API_BIND', '0.0.0.0:5000')  # 待ち受けるアドレスとポート
+API_WORKERS = int(os.getenv('API_WORKERS', os.cpu_count() or 1))  # ワーカープロセス数
+API_WORKER_CLASS = os.getenv('API_WORKER_CLASS', 'asyncio')  # 'asyncio' または 'uvloop'（uvloopが必要）
+API_KEEP_ALIVE_SECONDS = int(os.getenv('API_KEEP_ALIVE_SECONDS', 5))  # HTTP keep-aliveの保持時間（秒）
+API_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv('API_GRACEFUL_TIMEOUT_SECONDS', 30))  # 終了時に処理中のリクエストを待つ時間（秒）
+
+
+def build_config():
+    """
+    環境変数からHypercornの設定を作成します。
+
+    各ワーカープロセスは独立したイベントループと、MongoDB・OpenSearchの接続プールを持ちます。
+
+    :return: Hypercornの設定。
+    """
+    config = Config()
+    config.application_path = 'app:app'
+    config.bind = [API_BIND]
+    config.workers = API_WORKERS
+    config.worker_class = API_WORKER_CLASS
+    config.keep_alive_timeout = API_KEEP_ALIVE_SECONDS
+    config.graceful_timeout = API_GRACEFUL_TIMEOUT_SECONDS
+    config.accesslog = '-'
+    config.errorlog = '-'
+    return config
+
+
+if __name__ == '__main__':
+    run(build_config())
@@ -0,0 +1,105 @@
+import os
+import unicodedata
+from bisect import bisect_left
+
+# 法令名のサジェストの設定
+SUGGEST_DEFAULT_SIZE = int(os.getenv('SUGGEST_DEFAULT_SIZE', 10))  # /suggest の既定の取得件数
+SUGGEST_MAX_SIZE = 50  # /suggest で取得できる件数の上限
+SUGGEST_MAX_PREFIX_LENGTH = 100  # /suggest の prefix の文字数の上限
+SUGGEST_REFRESH_SECONDS = float(os.getenv('SUGGEST_REFRESH_SECONDS', 600))  # インデックスの世代が変わらなくても索引を作り直す間隔（秒）
+SUGGEST_PROJECTION = {
+    '_id': 0, 'law_id': 1, 'law_title': 1, 'law_num': 1,
+    'law_title_kana': 1, 'law_title_abbrevs': 1, 'law_title_abbrev_kanas': 1
+}
+MATCH_PRIORITIES = {'title': 0, 'abbrev': 1, 'kana': 2}  # 同じキーに一致した場合の順序（題名、略称、読みの順）
+KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+
+class TitleIndex:
+    """
+    法令名・略称・読み（かな）の前方一致検索のために、正規化したキーをソートして保持する索引。
+
+    検索は二分探索と一致するキーの走査だけで完了するため、法令数に関わらず1回の検索はミリ秒未満です。
+    構築後は変更しないため、複数のリクエストから同時に参照できます（作り直す場合は新しいインスタンスに差し替えます）。
+    """
+
+    def __init__(self, documents):
+        """
+        MongoDBの `laws` コレクションのドキュメントから索引を作成します。
+
+        同じ題名の法令（改正ごとの版）は、`law_id` が最大のもの（最新の版）だけを候補にします。
+
+        :param documents: `SUGGEST_PROJECTION` の項目を含むドキュメントのイテラブル。
+        """
+        latest = {}  # 題名 → ドキュメント
+        for document in documents:
+            title = document.get('law_title')
+            if not title or not document.get('law_id'):
+                continue
+            current = latest.get(title)
+            if current is None or document['law_id'] > current['law_id']:
+                latest[title] = document
+
+        keyed = []
+        for document in latest.values():
+            entry = {'law_id': document['law_id'], 'law_title': document['law_title'], 'law_num': document.get('law_num')}
+            for kind, text in iter_suggest_texts(document):
+                key = normalize_prefix(text)
+                if key:
+                    keyed.append((key, MATCH_PRIORITIES[kind], document['law_id'], kind, text, entry))
+        keyed.sort(key=lambda item: item[:3])
+
+        self.keys = [item[0] for item in keyed]
+        self.values = [item[3:] for item in keyed]
+        self.laws = len(latest)
+
+    def search(self, prefix, size=SUGGEST_DEFAULT_SIZE):
+        """
+        正規化したキーが `prefix` で始まる法令を、キーの辞書順（短い題名が先）に返します。1件の法令は1回だけ返します。
+
+        :param prefix: 入力中の文字列。
+        :param size: 返す件数の上限。
+        :return: 'law_id'、'law_title'、'law_num'、'matched'（'title'、'abbrev'、'kana'）、'text'（一致した文字列）を含む辞書のリスト。
+        """
+        key = normalize_prefix(prefix)
+        if not key:
+            return []
+        suggestions = []
+        seen = set()
+        for position in range(bisect_left(self.keys, key), len(self.keys)):
+            if not self.keys[position].startswith(key):
+                break
+            kind, text, entry = self.values[position]
+            if entry['law_id'] in seen:
+                continue
+            seen.add(entry['law_id'])
+            suggestions.append({**entry, 'matched': kind, 'text': text})
+            if len(suggestions) >= size:
+                break
+        return suggestions
+
+
+def iter_suggest_texts(document):
+    """
+    1件の法令から、サジェストの対象とする文字列（題名、略称、題名と略称の読み）を取り出します。
+
+    :param document: `SUGGEST_PROJECTION` の項目を含むドキュメント。
+    :return: 種類（'title'、'abbrev'、'kana'）と文字列のタプルを返すジェネレータ。
+    """
+    yield 'title', document['law_title']
+    for abbrev in document.get('law_title_abbrevs') or []:
+        yield 'abbrev', abbrev
+    if document.get('law_title_kana'):
+        yield 'kana', document['law_title_kana']
+    for kana in document.get('law_title_abbrev_kanas') or []:
+        yield 'kana', kana
+
+
+def normalize_prefix(text):
+    """
+    前方一致の比較用に文字列を正規化します（NFKC正規化、英字の小文字化、空白の除去、カタカナのひらがな化）。
+
+    :param text: 文字列。
+    :return: 正規化された文字列。
+    """
+    return ''.join(unicodedata.normalize('NFKC', text).lower().split()).translate(KATAKANA_TO_HIRAGANA)
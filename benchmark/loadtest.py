@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import random
+import asyncio
+import argparse
+import urllib.parse
+from collections import Counter
+from datetime import datetime, timezone
+
+import aiohttp
+
+from bench import REPO_ROOT, describe_environment, summarize_latencies
+
+# 負荷試験の設定
+DEFAULT_HTTP_FILE = os.path.join(REPO_ROOT, 'api_test.http')  # クエリログを指定しない場合に使用するリクエスト例
+DEFAULT_PATHS = ['/search/by-query', '/search/by-id']  # 再生するエンドポイント
+DEFAULT_TIMEOUT_SECONDS = 30  # 1件のリクエストのタイムアウト（秒）
+
+
+def main(argv=None):
+    """
+    クエリログのリクエストを検索APIに送信して負荷試験を行い、結果をJSONで出力します。
+
+    :param argv: コマンドライン引数（Noneの場合は `sys.argv`）。
+    :return: 終了コード（エラー率が `--max-error-rate` を超えた場合は1）。
+    """
+    args = parse_args(argv)
+    requests = load_requests(args)
+    if not requests:
+        raise SystemExit(f"再生するリクエストがありません（対象: {','.join(args.paths)}）")
+    print(f"{len(requests)}件のリクエストを再生します（{args.mode}）", file=sys.stderr)
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    samples, elapsed = asyncio.run(run_load(args, requests))
+    result = {
+        'started_at': started_at,
+        'finished_at': datetime.now(timezone.utc).isoformat(),
+        'environment': describe_environment(),
+        'config': {
+            'base_url': args.base_url,
+            'mode': args.mode,
+            'source': args.log or args.http_file,
+            'distinct_requests': len(requests),
+            'target_rps': args.rps if args.mode == 'open' else None,
+            'arrival': args.arrival if args.mode == 'open' else None,
+            'concurrency': args.concurrency,
+            'duration_sec': args.duration,
+            'warmup_requests': args.warmup,
+            'seed': args.seed
+        },
+        'results': summarize_samples(samples, elapsed)
+    }
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output + '\n')
+        print(f"結果を書き込みました: {args.output}", file=sys.stderr)
+    else:
+        print(output)
+    return 1 if result['results']['error_rate'] > args.max_error_rate else 0
+
+
+def parse_args(argv=None):
+    """
+    コマンドライン引数を解析します。
+
+    :param argv: コマンドライン引数（Noneの場合は `sys.argv`）。
+    :return: 解析結果の `argparse.Namespace`。
+    """
+    parser = argparse.ArgumentParser(description='検索APIの負荷試験')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5555', help='APIのURL')
+    parser.add_argument('--log', help='再生するクエリログ（JSONLまたは1行1クエリのテキスト）')
+    parser.add_argument('--http-file', default=DEFAULT_HTTP_FILE, help='--log を指定しない場合に再生する .http ファイル')
+    parser.add_argument('--paths', type=lambda value: value.split(','), default=DEFAULT_PATHS,
+                        help='再生するエンドポイントのパス（カンマ区切り）')
+    parser.add_argument('--mode', choices=['open', 'closed'], default='open',
+                        help='open は応答を待たずに --rps で送信し待ち時間も計測、closed は --concurrency 件ずつ応答を待って送信')
+    parser.add_argument('--rps', type=float, default=50, help='open モードの目標リクエスト数（毎秒）')
+    parser.add_argument('--arrival', choices=['uniform', 'poisson'], default='poisson',
+                        help='open モードのリクエストの間隔（一定、または指数分布）')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='closed モードの並列数、open モードの同時接続数の上限（0 は無制限）')
+    parser.add_argument('--duration', type=float, default=30, help='計測する時間（秒）')
+    parser.add_argument('--warmup', type=int, default=20, help='計測前に送信するリクエスト数')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT_SECONDS, help='1件のリクエストのタイムアウト（秒）')
+    parser.add_argument('--seed', type=int, default=42, help='リクエストの順序と間隔の乱数シード')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='これを超えると終了コード1にするエラー率')
+    parser.add_argument('--output', help='結果のJSONを書き込むファイル（省略時は標準出力）')
+    args = parser.parse_args(argv)
+    if args.mode == 'open' and args.rps <= 0:
+        parser.error('--rps には正の値を指定してください')
+    if args.mode == 'closed' and args.concurrency <= 0:
+        parser.error('closed モードの --concurrency には正の値を指定してください')
+    return args
+
+
+def load_requests(args):
+    """
+    `--log` または `--http-file` から、再生するリクエストを読み込みます。
+
+    :param args: `parse_args` の結果。
+    :return: 'method'、'path'、'params'、'body' を含む辞書のリスト（`--paths` のエンドポイントのみ）。
+    """
+    requests = load_query_log(args.log) if args.log else load_http_file(args.http_file)
+    return [request for request in requests if request['path'] in args.paths]
+
+
+def load_query_log(path):
+    """
+    クエリログを読み込みます。各行は次のいずれかの形式です。
+
+    - `{"path": "/search/by-query", "params": {"query": "税"}}`（`method` と `body` も指定可）
+    - `{"law_id": "..."}`（`/search/by-id`。その他の項目はクエリパラメータ）
+    - `{"query": "税", "granularity": "article"}`（`/search/by-query`。その他の項目はクエリパラメータ）
+    - JSONでない行は、そのまま `/search/by-query` のクエリとして扱います。
+
+    :param path: クエリログのファイルパス。
+    :return: 'method'、'path'、'params'、'body' を含む辞書のリスト。
+    """
+    requests = []
+    with open(path, encoding='utf-8') as log_file:
+        for line in log_file:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.decoder.JSONDecodeError:
+                entry = {'query': line}
+            if not isinstance(entry, dict):
+                entry = {'query': str(entry)}
+            if 'path' in entry:
+                requests.append({
+                    'method': entry.get('method', 'GET').upper(),
+                    'path': entry['path'],
+                    'params': entry.get('params') or {},
+                    'body': entry.get('body')
+                })
+            else:
+                endpoint = '/search/by-id' if 'law_id' in entry else '/search/by-query'
+                requests.append({'method': 'GET', 'path': endpoint, 'params': entry, 'body': None})
+    return requests
+
+
+def load_http_file(path):
+    """
+    `api_test.http` 形式（`###` で区切られた「メソッド URL」、ヘッダー、空行、本文）のリクエスト例を読み込みます。
+
+    :param path: .http ファイルのパス。
+    :return: 'method'、'path'、'params'、'body' を含む辞書のリスト。ホスト部分は `--base-url` に置き換えます。
+    """
+    requests = []
+    with open(path, encoding='utf-8') as http_file:
+        blocks = http_file.read().split('###')
+    for block in blocks:
+        lines = [line for line in block.splitlines() if not line.lstrip().startswith('#')]
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        if not lines or ' ' not in lines[0].strip():
+            continue
+        method, url = lines[0].strip().split(None, 1)
+        parsed = urllib.parse.urlsplit(url.strip())
+        body_lines = []
+        for number, line in enumerate(lines[1:], 1):
+            if not line.strip():
+                body_lines = lines[number + 1:]
+                break
+        body_text = '\n'.join(body_lines).strip()
+        try:
+            body = json.loads(body_text) if body_text and method.upper() != 'GET' else None
+        except json.decoder.JSONDecodeError:
+            body = None
+        requests.append({
+            'method': method.upper(),
+            'path': parsed.path,
+            'params': dict(urllib.parse.parse_qsl(parsed.query)),
+            'body': body
+        })
+    return requests
+
+
+async def run_load(args, requests):
+    """
+    ウォームアップの後、`--mode` に従ってリクエストを送信します。
+
+    :param args: `parse_args` の結果。
+    :param requests: `load_requests` の結果。
+    :return: `send_request` の結果のリストと、計測時間（秒）のタプル。
+    """
+    rng = random.Random(args.seed)
+    connector = aiohttp.TCPConnector(limit=args.concurrency if args.concurrency > 0 else 0)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(args.base_url, connector=connector, timeout=timeout) as session:
+        for number in range(args.warmup):
+            await send_request(session, requests[number % len(requests)])
+        if args.mode == 'open':
+            return await run_open_loop(session, requests, args, rng)
+        return await run_closed_loop(session, requests, args, rng)
+
+
+async def run_open_loop(session, requests, args, rng):
+    """
+    応答を待たずに、到着時刻の予定に従ってリクエストを送信します（オープンループ）。
+
+    各リクエストのレイテンシは、実際に送信した時刻ではなく予定の到着時刻から計測するため、
+    APIが遅くなった場合の待ち時間（クライアント側の接続待ちを含む）も結果に含まれます。
+
+    :param session: `aiohttp.ClientSession`。
+    :param requests: `load_requests` の結果。
+    :param args: `parse_args` の結果。
+    :param rng: 到着間隔とリクエストの選択に使用する `random.Random`。
+    :return: `send_request` の結果のリストと、計測時間（秒）のタプル。
+    """
+    loop = asyncio.get_running_loop()
+    tasks = []
+    started_at = loop.time()
+    offset = 0.0
+    while offset < args.duration:
+        scheduled = started_at + offset
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send_request(session, rng.choice(requests), scheduled)))
+        offset += rng.expovariate(args.rps) if args.arrival == 'poisson' else 1 / args.rps
+    samples = await asyncio.gather(*tasks)
+    return samples, loop.time() - started_at
+
+
+async def run_closed_loop(session, requests, args, rng):
+    """
+    `--concurrency` 件のワーカーが、それぞれ応答を受け取ってから次のリクエストを送信します（クローズドループ）。
+
+    :param session: `aiohttp.ClientSession`。
+    :param requests: `load_requests` の結果。
+    :param args: `parse_args` の結果。
+    :param rng: リクエストの選択に使用する `random.Random`。
+    :return: `send_request` の結果のリストと、計測時間（秒）のタプル。
+    """
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    deadline = started_at + args.duration
+    samples = []
+
+    async def worker():
+        while loop.time() < deadline:
+            samples.append(await send_request(session, rng.choice(requests)))
+
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    return samples, loop.time() - started_at
+
+
+async def send_request(session, request, scheduled=None):
+    """
+    1件のリクエストを送信し、処理時間を計測します。
+
+    :param session: `aiohttp.ClientSession`。
+    :param request: 'method'、'path'、'params'、'body' を含む辞書。
+    :param scheduled: 予定の到着時刻（イベントループの時刻。Noneの場合は送信した時刻）。
+    :return: 'path'、'status'、'error'、'latency'（予定の到着時刻から応答の受信まで）、'queue_delay'（予定から送信開始まで）を含む辞書。
+    """
+    loop = asyncio.get_running_loop()
+    sent_at = loop.time()
+    scheduled = sent_at if scheduled is None else scheduled
+    status = None
+    error = None
+    try:
+        async with session.request(
+            request['method'], request['path'], params=request['params'] or None, json=request['body']
+        ) as response:
+            await response.read()
+            status = response.status
+            if status >= 400:
+                error = f'HTTP {status}'
+    except asyncio.TimeoutError:
+        error = 'timeout'
+    except aiohttp.ClientError as e:
+        error = type(e).__name__
+    finished_at = loop.time()
+    return {
+        'path': request['path'],
+        'status': status,
+        'error': error,
+        'latency': finished_at - scheduled,
+        'queue_delay': sent_at - scheduled
+    }
+
+
+def summarize_samples(samples, elapsed):
+    """
+    計測結果から、スループット、エラー率、レイテンシのパーセンタイルをエンドポイントごとと全体で集計します。
+
+    :param samples: `send_request` の結果のリスト。
+    :param elapsed: 計測時間（秒）。
+    :return: 'requests'、'elapsed_sec'、'achieved_rps'、'errors'、'error_rate'、'errors_by_type'、
+        'latency_ms'、'queue_delay_ms'、'endpoints' を含む辞書。
+    """
+    errors = Counter(sample['error'] for sample in samples if sample['error'])
+    endpoints = {}
+    for path in sorted({sample['path'] for sample in samples}):
+        path_samples = [sample for sample in samples if sample['path'] == path]
+        path_errors = sum(1 for sample in path_samples if sample['error'])
+        endpoints[path] = {
+            'requests': len(path_samples),
+            'errors': path_errors,
+            'error_rate': round(path_errors / len(path_samples), 4),
+            'latency_ms': summarize_latencies([sample['latency'] for sample in path_samples if not sample['error']])
+        }
+    error_count = sum(errors.values())
+    return {
+        'requests': len(samples),
+        'elapsed_sec': round(elapsed, 3),
+        'achieved_rps': round(len(samples) / elapsed, 1) if elapsed > 0 else None,
+        'errors': error_count,
+        'error_rate': round(error_count / len(samples), 4) if samples else 0.0,
+        'errors_by_type': dict(errors),
+        'latency_ms': summarize_latencies([sample['latency'] for sample in samples if not sample['error']]),
+        'queue_delay_ms': summarize_latencies([sample['queue_delay'] for sample in samples]),
+        'endpoints': endpoints
+    }
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,22 @@
 import os
+import re
 import json
-from pymongo import MongoClient, UpdateOne
+import time
+import queue
+import hashlib
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pymongo import MongoClient, UpdateOne, ASCENDING
 from pymongo.errors import ConnectionFailure
 
+from law_common.index_state import all_pending, cache_generation_update
+from law_common.partitions import PARTITION_INDEXES
+from law_common.xml_storage import XML_STORAGE_FORMATS, ZSTD_AVAILABLE, decode_xml_content, encode_xml_content
+
 # DocumentDBの接続情報
 DOCDB_URI = os.environ.get('DOCDB_URI')
+INDEX_NAME = os.environ.get('INDEX_NAME', 'law-index')  # 検索APIのキャッシュの世代を記録するドキュメントの_id（APIの INDEX_NAME と同じ値）
 
 if DOCDB_URI is None:
     raise ValueError("DOCDB_URIが設定されていません")
@@ -19,9 +31,29 @@ except ConnectionFailure:
 
 db = client['law_db']
 collection = db['laws']
+manifest_collection = db['register_manifest']  # データディレクトリごとのファイルマニフェスト
+index_state_collection = db['index_state']  # 検索APIのレスポンスキャッシュの世代など
 
 # バッチサイズの設定
-BATCH_SIZE = 100  # 1回のバッチで処理するファイルの数
+BATCH_SIZE = 100  # 1回のバッチで処理する（読み込んだ）ファイルの数
+BATCH_BYTES = int(os.environ.get('REGISTER_BATCH_BYTES', 16 * 1024 * 1024))  # 1回のバッチのバイト数の上限
+READ_WORKERS = int(os.environ.get('REGISTER_READ_WORKERS', 8))  # ファイルを読み込むワーカー数
+WRITE_QUEUE_SIZE = int(os.environ.get('REGISTER_WRITE_QUEUE_SIZE', 2))  # 書き込み待ちのバッチ数の上限
+
+# xml_contentの保存形式（'raw'、'gzip'、'zstd'）。xml_formatフィールドに記録されます
+XML_STORAGE_FORMAT = os.environ.get('XML_STORAGE_FORMAT', 'raw')
+
+# メタデータの抽出に使用する先頭部分のバイト数と正規表現
+METADATA_HEAD_BYTES = 64 * 1024
+LAW_ELEMENT_PATTERN = re.compile(rb'<Law\s([^>]*)>')
+LAW_ATTRIBUTE_PATTERN = re.compile(rb'(\w+)="([^"]*)"')
+LAW_NUM_PATTERN = re.compile(rb'<LawNum>(.*?)</LawNum>', re.DOTALL)
+LAW_TITLE_PATTERN = re.compile(rb'<LawTitle(\s[^>]*)?>(.*?)</LawTitle>', re.DOTALL)
+RT_PATTERN = re.compile(rb'<Rt>.*?</Rt>', re.DOTALL)
+TAG_PATTERN = re.compile(rb'<[^>]+>')
+ABBREV_SEPARATOR_PATTERN = re.compile(r'[,、，]')  # LawTitleのAbbrev・AbbrevKana属性で複数の略称を区切る文字
+# 元号ごとの元年の西暦
+ERA_BASE_YEARS = {'Meiji': 1868, 'Taisho': 1912, 'Showa': 1926, 'Heisei': 1989, 'Reiwa': 2019}
 
 
 def lambda_handler(event, context):
@@ -29,16 +61,48 @@ def lambda_handler(event, context):
     Lambda関数のエントリーポイント。
 
     :param event: イベントデータを含む辞書。この辞書には、処理するデータのディレクトリを指定する 'data_dir' キーが含まれています。
+        読み込みワーカー数 'read_workers' とバッチのバイト数 'batch_bytes' を指定することもできます。
+        'migrate_storage' に保存形式（'raw'、'gzip'、'zstd'）を指定した場合は、既存ドキュメントの `xml_content` をその形式に変換します。
+        'backfill_metadata' が真の場合は、メタデータの無い既存ドキュメントにメタデータを補完します。
     :param context: Lambda関数のランタイム情報。
     :return: HTTPステータスコードと、データがDocumentDBに正常に保存されたか、データディレクトリが提供されていないことを示すメッセージを含む辞書。
     """
+    if event.get('backfill_metadata'):
+        stats = backfill_metadata()
+        if stats['updated']:
+            bump_cache_generation()
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'message': 'メタデータを補完しました', 'documents': stats})
+        }
+
+    if event.get('migrate_storage'):
+        try:
+            stats = migrate_xml_storage(event['migrate_storage'])
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'message': str(e)})
+            }
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'message': 'xml_contentの保存形式を変換しました', 'documents': stats})
+        }
+
     data_dir = event.get('data_dir')
 
     if data_dir:
-        process_in_batches(data_dir)
+        stats = process_in_batches(
+            data_dir,
+            read_workers=int(event.get('read_workers', READ_WORKERS)),
+            batch_bytes=int(event.get('batch_bytes', BATCH_BYTES))
+        )
+        if stats['new'] or stats['changed']:
+            # /search/by-id や条文のエンドポイントが以前の内容を返し続けないよう、APIのキャッシュを破棄させる
+            bump_cache_generation()
         return {
             'statusCode': 200,
-            'body': json.dumps('データをDocumentDBに保存しました')
+            'body': json.dumps({'message': 'データをDocumentDBに保存しました', 'files': stats})
         }
 
     return {
@@ -47,62 +111,466 @@ def lambda_handler(event, context):
     }
 
 
-def process_in_batches(data_dir):
+def bump_cache_generation():
+    """
+    検索APIのレスポンスキャッシュの世代を更新し、登録した法令の以前の内容が返されないようにします。
+
+    :return: None
+    """
+    try:
+        index_state_collection.update_one(*cache_generation_update(INDEX_NAME), upsert=True)
+    except Exception as e:
+        print(f"キャッシュの世代の更新エラー: {e}")
+
+
+def process_in_batches(data_dir, read_workers=READ_WORKERS, batch_bytes=BATCH_BYTES):
     """
     バッチ処理でXMLファイルを読み取り、DocumentDBに書き込みます。
 
+    データディレクトリごとのマニフェスト（パス、サイズ、更新日時、ダイジェスト）と比較し、
+    サイズと更新日時が変わっていないファイルは開かずにスキップします。
+    変更の可能性があるファイルは読み込みワーカーがバイト列のまま並列に読み込んで検証し、
+    ダイジェストが変わったものだけを上限付きキュー経由で書き込みスレッドに渡します。
+    書き込みスレッドは順序なし（`ordered=False`）のバルク書き込みを行うため、ファイルの読み込みとDBへの書き込みが並行して進みます。
+
     :param data_dir: XMLファイルが配置されているディレクトリのパス。
-    :return: None
+    :param read_workers: ファイルを読み込むワーカー数。
+    :param batch_bytes: 1回のバッチのバイト数の上限。
+    :return: 新規・変更・変更なし・削除のファイル数とスループットを含む辞書。
     """
+    stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'deleted': 0, 'failed': 0, 'write_failed_batches': 0}
+    read_bytes = 0
+    read_files = 0
+    started_at = time.perf_counter()
     try:
-        bulk_operations = []
-        file_count = 0
-
-        for root, _, files in os.walk(data_dir):
-            for file in files:
-                if file.endswith('.xml'):
-                    try:
-                        xml_file_path = os.path.join(root, file)
-                        with open(xml_file_path, 'r', encoding='utf-8') as xml_file:
-                            xml_data = xml_file.read()
-                            law_id = file[:-4]  # ".xml"を取り除いて法令IDを取得
-                            document = {
-                                'law_id': law_id,
-                                'xml_content': xml_data
-                            }
-                            # アップデート操作 (既存なら更新、存在しないなら新規作成)
-                            bulk_operations.append(UpdateOne(
-                                {'law_id': law_id},
-                                {'$set': document},
-                                upsert=True
-                            ))
-                            file_count += 1
-                            if file_count % BATCH_SIZE == 0:
-                                # バッチを別途書き込み処理
-                                write_to_db(bulk_operations)
-                                bulk_operations = []
-
-                    except Exception as e:
-                        print(f"{file} のファイル処理エラー: {e}")
-
-        # バッチが残っている場合、最後に書き込み
-        if bulk_operations:
-            write_to_db(bulk_operations)
+        # law_idによるupsertと範囲スキャンのためのインデックスと、単位ごとの差分インデックス対象（index_pending）のみを含む部分インデックス
+        for keys, options in PARTITION_INDEXES:
+            collection.create_index(keys, **options)
+        manifest_collection.create_index([('data_dir', ASCENDING), ('path', ASCENDING)], unique=True)
+
+        manifest = load_manifest(data_dir)
+        seen_paths = set()
+
+        write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        writer = threading.Thread(target=write_batches, args=(write_queue, stats), daemon=True)
+        writer.start()
+
+        batch = {'records': [], 'manifest_operations': [], 'bytes': 0}
+
+        def handle_result(future, path):
+            nonlocal read_bytes, read_files
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"{path} のファイル処理エラー: {e}")
+                stats['failed'] += 1
+                return
+
+            read_files += 1
+            read_bytes += result['size']
+            entry = manifest.get(result['path'])
+            batch['manifest_operations'].append(UpdateOne(
+                {'data_dir': data_dir, 'path': result['path']},
+                {'$set': {'size': result['size'], 'mtime_ns': result['mtime_ns'], 'digest': result['content_hash']}},
+                upsert=True
+            ))
+            if entry and entry.get('digest') == result['content_hash']:
+                # 更新日時のみ変わったファイル
+                stats['unchanged'] += 1
+            else:
+                stats['changed' if entry else 'new'] += 1
+                batch['records'].append({
+                    'law_id': os.path.basename(result['path'])[:-4],  # ".xml"を取り除いて法令IDを取得
+                    'xml_content': result['xml_content'],
+                    'xml_format': result['xml_format'],
+                    'content_hash': result['content_hash'],
+                    'metadata': result['metadata']
+                })
+                batch['bytes'] += len(result['xml_content'])
+
+            if len(batch['manifest_operations']) >= BATCH_SIZE or batch['bytes'] >= batch_bytes:
+                # バッチを書き込みスレッドに渡す（キューが一杯の場合は待機）
+                write_queue.put((batch['records'], batch['manifest_operations']))
+                batch.update(records=[], manifest_operations=[], bytes=0)
+
+        try:
+            with ThreadPoolExecutor(max_workers=read_workers) as executor:
+                pending = {}
+                for path, stat in iter_xml_files(data_dir):
+                    seen_paths.add(path)
+                    entry = manifest.get(path)
+                    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                        stats['unchanged'] += 1
+                        continue
+
+                    pending[executor.submit(read_xml_file, data_dir, path, stat)] = path
+                    if len(pending) >= read_workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            handle_result(future, pending.pop(future))
+
+                for future, path in pending.items():
+                    handle_result(future, path)
+
+            # バッチが残っている場合、最後に書き込み
+            if batch['manifest_operations']:
+                write_queue.put((batch['records'], batch['manifest_operations']))
+        finally:
+            write_queue.put(None)
+            writer.join()
+
+        deleted_paths = [path for path in manifest if path not in seen_paths]
+        if deleted_paths:
+            stats['deleted'] = len(deleted_paths)
+            manifest_collection.delete_many({'data_dir': data_dir, 'path': {'$in': deleted_paths}})
 
     except Exception as e:
         print(f"ディレクトリ処理エラー: {e}")
 
+    elapsed = time.perf_counter() - started_at
+    stats['elapsed_sec'] = round(elapsed, 3)
+    stats['files_per_sec'] = round(read_files / elapsed, 1) if elapsed > 0 else 0.0
+    stats['mb_per_sec'] = round(read_bytes / (1024 * 1024) / elapsed, 2) if elapsed > 0 else 0.0
+    print(f"ファイル数: {stats}")
+    return stats
+
+
+def read_xml_file(data_dir, path, stat):
+    """
+    XMLファイルをバイト列のまま読み込み、検証してダイジェストを計算し、保存形式に変換します（読み込みワーカーで実行）。
+
+    :param data_dir: XMLファイルが配置されているディレクトリのパス。
+    :param path: データディレクトリからの相対パス。
+    :param stat: ファイルのstat情報。
+    :return: 'path'、'size'、'mtime_ns'、'xml_content'、'xml_format'、'content_hash'、'metadata' を含む辞書。
+    :raises ValueError: ファイルが法令XMLとして不正な場合。
+    """
+    with open(os.path.join(data_dir, path), 'rb') as xml_file:
+        xml_data = xml_file.read()
+
+    if b'<Law' not in xml_data[:4096]:
+        raise ValueError("Law要素が見つかりません")
+
+    xml_content, xml_format = encode_xml_content(xml_data, XML_STORAGE_FORMAT)
+    return {
+        'path': path,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'xml_content': xml_content,
+        'xml_format': xml_format,
+        'content_hash': compute_content_hash(xml_data),
+        'metadata': extract_law_metadata(xml_data)
+    }
+
+
+def write_batches(write_queue, stats):
+    """
+    キューからバッチを取り出してDocumentDBに書き込みます（書き込みスレッドで実行）。
+
+    バッチの書き込み中の例外はバッチごとに捕捉して失敗として数え、Noneを受け取るまでキューの読み出しを続けます
+    （書き込みスレッドが終了すると、上限付きのキューへの `put` と `join` で読み込み側が止まるため）。
+
+    :param write_queue: 書き込むバッチ（レコードのリストとマニフェスト操作のリストのタプル）のキュー。Noneを受け取ると終了します。
+    :param stats: 書き込みに失敗したバッチ数を記録する辞書。
+    :return: None
+    """
+    while True:
+        batch = write_queue.get()
+        if batch is None:
+            return
+        records, manifest_operations = batch
+        try:
+            written = flush_batch(records, manifest_operations)
+        except Exception as e:
+            print(f"バッチの書き込みエラー: {e}")
+            written = False
+        if not written:
+            stats['write_failed_batches'] += 1
+
+
+def iter_xml_files(data_dir):
+    """
+    データディレクトリ配下のXMLファイルを再帰的に列挙します。
+
+    `os.scandir` のエントリから取得したstat情報を使用するため、ファイルを開かずにサイズと更新日時を取得できます。
+
+    :param data_dir: XMLファイルが配置されているディレクトリのパス。
+    :return: データディレクトリからの相対パスとstat情報のタプルを返すジェネレータ。
+    """
+    directories = [data_dir]
+    while directories:
+        directory = directories.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.name.endswith('.xml'):
+                    yield os.path.relpath(entry.path, data_dir), entry.stat()
+
+
+def load_manifest(data_dir):
+    """
+    データディレクトリのマニフェストを読み込みます。
+
+    :param data_dir: XMLファイルが配置されているディレクトリのパス。
+    :return: 相対パスをキー、サイズ・更新日時・ダイジェストを含む辞書を値とする辞書。
+    """
+    return {
+        entry['path']: entry
+        for entry in manifest_collection.find({'data_dir': data_dir}, {'_id': 0, 'data_dir': 0})
+    }
+
+
+def flush_batch(records, manifest_operations):
+    """
+    変更されたファイルをDocumentDBに書き込み、成功した場合はマニフェストを更新します。
+
+    :param records: 'law_id'、'xml_content'、'content_hash' を含む辞書のリスト。
+    :param manifest_operations: マニフェストに対するバルク書き込み操作のリスト。
+    :return: 書き込みに成功した場合はTrue、失敗した場合はFalse。
+    """
+    if records and not write_to_db(build_upsert_operations(records)):
+        # 書き込みに失敗したファイルは次回も対象にするため、マニフェストを更新しない
+        return False
+    try:
+        manifest_collection.bulk_write(manifest_operations, ordered=False)
+        return True
+    except Exception as db_e:
+        print(f"マニフェスト書き込みエラー: {db_e}")
+        return False
+
+
+def compute_content_hash(xml_data):
+    """
+    XMLコンテンツのハッシュ値（SHA-256）を計算します。
+
+    :param xml_data: XMLコンテンツ（文字列またはバイト列）。
+    :return: 16進数文字列のハッシュ値。ファイルのダイジェストとしても使用します。
+    """
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode('utf-8')
+    return hashlib.sha256(xml_data).hexdigest()
+
+
+def build_upsert_operations(records):
+    """
+    内容が変更された法令のみを対象に、upsert操作のリストを作成します。
+
+    バッチ内の法令IDについて既存のハッシュ値を1回のクエリで取得し、ハッシュ値が一致するもの（内容が変わっていないもの）は
+    書き込みを行いません。変更されたものは `content_hash`、`updated_at` を更新して `version` を加算し、
+    すべての単位（'law'、'article'）の差分インデックスの対象として `index_pending` を設定します。
+
+    :param records: 'law_id'、'xml_content'、'xml_format'、'content_hash'、'metadata' を含む辞書のリスト。
+    :return: データベース上で実行するバルク書き込み操作のリスト。
+    """
+    law_ids = [record['law_id'] for record in records]
+    existing_hashes = {
+        document['law_id']: document.get('content_hash')
+        for document in collection.find({'law_id': {'$in': law_ids}}, {'law_id': 1, 'content_hash': 1, '_id': 0})
+    }
+
+    now = datetime.now(timezone.utc)
+    bulk_operations = []
+    for record in records:
+        if existing_hashes.get(record['law_id']) == record['content_hash']:
+            continue
+        # アップデート操作 (既存なら更新、存在しないなら新規作成)
+        bulk_operations.append(UpdateOne(
+            {'law_id': record['law_id']},
+            {
+                '$set': {
+                    'law_id': record['law_id'],
+                    'xml_content': record['xml_content'],
+                    'xml_format': record['xml_format'],
+                    'content_hash': record['content_hash'],
+                    'updated_at': now,
+                    'index_pending': all_pending(),
+                    **record.get('metadata', {})
+                },
+                '$inc': {'version': 1}
+            },
+            upsert=True
+        ))
+
+    print(f"変更なしのためスキップしたドキュメントの数: {len(records) - len(bulk_operations)}")
+    return bulk_operations
+
+
+def extract_law_metadata(xml_data):
+    """
+    法令XMLの先頭部分から、題名・法令番号・元号・公布日などの軽量なメタデータを抽出します。
+
+    XML全体を解析せず、先頭部分に対する正規表現のみで抽出するため、登録時のコストはほとんどかかりません。
+
+    :param xml_data: XMLのバイト列。
+    :return: 'law_title'、'law_title_kana'、'law_num'、'era'、'year'、'law_type'、'promulgation_date' のうち抽出できたものと、
+        'law_title_abbrevs'・'law_title_abbrev_kanas'（略称とその読みのリスト。無い場合は空のリスト）を含む辞書。
+    """
+    head = xml_data[:METADATA_HEAD_BYTES]
+    metadata = {}
+
+    law_element = LAW_ELEMENT_PATTERN.search(head)
+    if law_element:
+        attributes = {
+            name.decode('utf-8'): value.decode('utf-8')
+            for name, value in LAW_ATTRIBUTE_PATTERN.findall(law_element.group(1))
+        }
+        metadata['era'] = attributes.get('Era')
+        metadata['law_type'] = attributes.get('LawType')
+        if attributes.get('Year', '').isdigit():
+            metadata['year'] = int(attributes['Year'])
+        metadata['promulgation_date'] = to_promulgation_date(
+            attributes.get('Era'), attributes.get('Year'),
+            attributes.get('PromulgateMonth'), attributes.get('PromulgateDay')
+        )
+
+    law_num = LAW_NUM_PATTERN.search(head)
+    if law_num:
+        metadata['law_num'] = law_num.group(1).decode('utf-8').strip()
+
+    law_title = LAW_TITLE_PATTERN.search(head)
+    metadata['law_title_abbrevs'] = []
+    metadata['law_title_abbrev_kanas'] = []
+    if law_title:
+        title = TAG_PATTERN.sub(b'', RT_PATTERN.sub(b'', law_title.group(2)))
+        metadata['law_title'] = title.decode('utf-8').strip()
+        # 題名の読みと略称（/suggest の入力補完に使用）
+        attributes = {
+            name.decode('utf-8'): value.decode('utf-8')
+            for name, value in LAW_ATTRIBUTE_PATTERN.findall(law_title.group(1) or b'')
+        }
+        metadata['law_title_kana'] = attributes.get('Kana') or None
+        metadata['law_title_abbrevs'] = split_abbrevs(attributes.get('Abbrev'))
+        metadata['law_title_abbrev_kanas'] = split_abbrevs(attributes.get('AbbrevKana'))
+
+    return {key: value for key, value in metadata.items() if value is not None}
+
+
+def split_abbrevs(value):
+    """
+    LawTitleのAbbrev・AbbrevKana属性の値を、略称ごとのリストに分割します。
+
+    :param value: 属性の値（Noneの場合は属性が無い）。
+    :return: 空白を取り除いた略称のリスト。
+    """
+    return [abbrev.strip() for abbrev in ABBREV_SEPARATOR_PATTERN.split(value or '') if abbrev.strip()]
+
+
+def to_promulgation_date(era, year, month, day):
+    """
+    元号と年月日から公布日（YYYY-MM-DD形式）を作成します。
+
+    :param era: 元号（'Meiji'、'Taisho'、'Showa'、'Heisei'、'Reiwa'）。
+    :param year: 元号での年。
+    :param month: 公布月。
+    :param day: 公布日。
+    :return: YYYY-MM-DD形式の文字列。いずれかが不明な場合はNone。
+    """
+    if era not in ERA_BASE_YEARS or not all(str(value or '').isdigit() for value in (year, month, day)):
+        return None
+    return f"{ERA_BASE_YEARS[era] + int(year) - 1:04d}-{int(month):02d}-{int(day):02d}"
+
+
+def backfill_metadata():
+    """
+    メタデータ（`law_title`、または後から追加した題名の略称 `law_title_abbrevs`）の無い既存ドキュメントに、
+    `xml_content` から抽出したメタデータを補完します。
+
+    :return: 補完・失敗したドキュメント数を含む辞書。
+    """
+    stats = {'updated': 0, 'failed': 0}
+    bulk_operations = []
+    cursor = collection.find(
+        {'law_title_abbrevs': {'$exists': False}},
+        {'_id': 1, 'law_id': 1, 'xml_content': 1, 'xml_format': 1}
+    )
+    for document in cursor:
+        try:
+            xml_data = decode_xml_content(document['xml_content'], document.get('xml_format'))
+            bulk_operations.append(UpdateOne(
+                {'_id': document['_id']},
+                {'$set': extract_law_metadata(xml_data)}
+            ))
+        except Exception as e:
+            print(f"{document.get('law_id')} のメタデータ抽出エラー: {e}")
+            stats['failed'] += 1
+            continue
+
+        if len(bulk_operations) >= BATCH_SIZE:
+            stats['updated' if write_to_db(bulk_operations) else 'failed'] += len(bulk_operations)
+            bulk_operations = []
+
+    if bulk_operations:
+        stats['updated' if write_to_db(bulk_operations) else 'failed'] += len(bulk_operations)
+
+    print(f"メタデータの補完: {stats}")
+    return stats
+
+
+def migrate_xml_storage(target_format):
+    """
+    既存ドキュメントの `xml_content` を指定された保存形式に変換します。
+
+    内容（`content_hash`）は変わらないため、`updated_at` や `index_pending` は更新しません。
+
+    :param target_format: 変換後の保存形式（'raw'、'gzip'、'zstd'）。
+    :return: 変換・失敗したドキュメント数を含む辞書。
+    :raises ValueError: 未対応の保存形式が指定された場合、またはzstd形式に必要な `zstandard` がインストールされていない場合。
+    """
+    if target_format not in XML_STORAGE_FORMATS:
+        raise ValueError(f"未対応の保存形式です: {target_format}（{', '.join(XML_STORAGE_FORMATS)} のいずれかを指定してください）")
+    if target_format == 'zstd' and not ZSTD_AVAILABLE:
+        raise ValueError("zstd形式への変換にはzstandardが必要です")
+
+    stats = {'migrated': 0, 'failed': 0}
+
+    bulk_operations = []
+    cursor = collection.find(
+        {'xml_format': {'$ne': target_format}},
+        {'_id': 1, 'law_id': 1, 'xml_content': 1, 'xml_format': 1}
+    )
+    for document in cursor:
+        try:
+            xml_data = decode_xml_content(document['xml_content'], document.get('xml_format'))
+            xml_content, xml_format = encode_xml_content(xml_data, target_format)
+            bulk_operations.append(UpdateOne(
+                {'_id': document['_id']},
+                {'$set': {'xml_content': xml_content, 'xml_format': xml_format}}
+            ))
+        except Exception as e:
+            print(f"{document.get('law_id')} の変換エラー: {e}")
+            stats['failed'] += 1
+            continue
+
+        if len(bulk_operations) >= BATCH_SIZE:
+            if write_to_db(bulk_operations):
+                stats['migrated'] += len(bulk_operations)
+            else:
+                stats['failed'] += len(bulk_operations)
+            bulk_operations = []
+
+    if bulk_operations:
+        if write_to_db(bulk_operations):
+            stats['migrated'] += len(bulk_operations)
+        else:
+            stats['failed'] += len(bulk_operations)
+
+    print(f"保存形式の変換: {stats}")
+    return stats
+
 
 def write_to_db(bulk_operations):
     """
     データベースに対してバルク書き込み操作を実行します。
 
     :param bulk_operations: データベース上で実行するバルク書き込み操作のリスト。
-    :return: None
+    :return: 書き込みに成功した場合（または書き込む操作が無い場合）はTrue、失敗した場合はFalse。
     """
     try:
         if bulk_operations:
-            result = collection.bulk_write(bulk_operations)
+            result = collection.bulk_write(bulk_operations, ordered=False)
             print(f"新規作成またはアップデートされたドキュメントの数: {result.upserted_count + result.modified_count}")
+        return True
     except Exception as db_e:
         print(f"データベースバルク挿入エラー: {db_e}")
+        return False
@@ -0,0 +1,77 @@
+import os
+import threading
+from pymongo import MongoClient
+
+# MongoDBクライアントの設定（Lambda関数は同時に1件のイベントだけを処理するため、接続プールは小さくします）
+DATABASE_NAME = 'law_db'
+MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', 10))  # MongoDB接続プールの上限
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000))  # MongoDBへの接続のタイムアウト（ミリ秒）
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000))  # MongoDBのサーバーを選択できるまで待つ時間の上限（ミリ秒）
+
+
+class LazyClient:
+    """
+    最初に属性を参照した時点で `factory` を呼び出してクライアントを作成し、以降は同じクライアントに委譲するプロキシ。
+
+    モジュールの読み込み時には接続しないため、コールドスタートが短くなり、ウォームスタートでは接続プールを再利用します。
+    作成に失敗した場合は例外をそのまま送出し、次に参照した時点で再度作成します。
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        クライアントを返します（未作成の場合は作成します）。
+
+        :return: `factory` が返したクライアント。
+        """
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def create_mongo_client(uri):
+    """
+    接続プールの上限とタイムアウトを設定したMongoDBクライアントを作成します。
+
+    :param uri: MongoDB（DocumentDB）の接続URI。
+    :return: `MongoClient` のインスタンス。
+    """
+    print('MongoDBに接続中...')
+    mongo_client = MongoClient(
+        uri,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS
+    )
+    print('MongoDBに接続しました。')
+    return mongo_client
+
+
+def lazy_mongo_client(uri):
+    """
+    最初に使用した時点で `create_mongo_client` を呼び出す `LazyClient` を作成します。
+
+    :param uri: MongoDB（DocumentDB）の接続URI。
+    :return: `LazyClient` のインスタンス。
+    """
+    return LazyClient(lambda: create_mongo_client(uri))
+
+
+def lazy_collection(mongo_client, name):
+    """
+    `law_db` データベースのコレクションを、最初に使用した時点で取得する `LazyClient` を作成します。
+
+    :param mongo_client: `lazy_mongo_client` で作成したクライアント。
+    :param name: コレクション名。
+    :return: `LazyClient` のインスタンス。
+    """
+    return LazyClient(lambda: mongo_client.get()[DATABASE_NAME][name])
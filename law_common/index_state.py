@@ -0,0 +1,130 @@
+import os
+from datetime import datetime, timezone
+
+INDEX_GRANULARITIES = ('law', 'article')  # インデックスの単位（'law' は法令ごと、'article' は条ごと）
+# granularityが指定されていない場合の単位（lambda_indexのINDEX_GRANULARITYと同じ値）。移行前の indexed_hash もこの単位のものとして扱います
+DEFAULT_INDEX_GRANULARITY = os.getenv('INDEX_GRANULARITY', 'law')
+
+INDEX_STATE_SCHEMA_ID = 'laws_index_state'  # index_state コレクションで移行済みのバージョンを記録するドキュメントの_id
+INDEX_STATE_SCHEMA_VERSION = 1  # laws コレクションのインデックス状態（index_pending / indexed_hash）の形式のバージョン
+
+# このプロセスで移行済みを確認したかどうか
+_schema_checked = False
+
+
+def pending_field(granularity):
+    """
+    指定した単位の差分インデックス対象を表すフィールド名を返します。
+
+    :param granularity: インデックスの単位（'law' または 'article'）。
+    :return: 'index_pending.<granularity>'。
+    """
+    return f'index_pending.{granularity}'
+
+
+def all_pending():
+    """
+    内容が変更された法令に設定する `index_pending` の値を返します（すべての単位で差分インデックスの対象にします）。
+
+    :return: 単位をキー、Trueを値とする辞書。
+    """
+    return {granularity: True for granularity in INDEX_GRANULARITIES}
+
+
+def cache_generation_update(index_name):
+    """
+    検索APIのレスポンスキャッシュの世代を更新するためのフィルタと更新内容を返します。
+
+    APIの各ワーカーは `index_state` コレクションの `_id: <index_name>` の `generation` が変わると、レスポンスキャッシュを破棄します。
+    インデックス処理の完了時だけでなく、法令の内容が変わった登録の後にも更新します。
+    同期（pymongo）・非同期（AsyncMongoClient）のどちらのドライバでも `update_one(filter, update, upsert=True)` として使用できます。
+
+    :param index_name: 法令ごとのインデックス名（`INDEX_NAME`）。
+    :return: フィルタと更新内容のタプル。
+    """
+    return {'_id': index_name}, {'$inc': {'generation': 1}, '$set': {'updated_at': datetime.now(timezone.utc)}}
+
+
+def index_state_migrations(legacy_granularity=DEFAULT_INDEX_GRANULARITY):
+    """
+    単位ごとのインデックス状態へ移行するための更新を返します。
+
+    以前は `index_pending` と `indexed_hash` / `indexed_at` を単位に関係なく1つの値で管理していたため、
+    `index_pending: true` はすべての単位の対象に、`indexed_hash` / `indexed_at` は `legacy_granularity` の値に移し、
+    その他の単位では差分インデックスの対象にします。
+    同期（pymongo）・非同期（AsyncMongoClient）のどちらのドライバでも `update_many(filter, update)` として順に実行でき、
+    途中で中断しても再実行できます。
+
+    :param legacy_granularity: 以前の `indexed_hash` を記録した単位。
+    :return: フィルタと更新内容のタプルのリスト。
+    """
+    other_pending = {
+        pending_field(granularity): True for granularity in INDEX_GRANULARITIES if granularity != legacy_granularity
+    }
+    return [
+        ({'index_pending': True}, {'$set': {'index_pending': all_pending()}}),
+        # 同じフィールドの下位には直接 $rename できないため、いったん別の名前に移す
+        (
+            {'indexed_hash': {'$exists': True, '$not': {'$type': 'object'}}},
+            {'$rename': {'indexed_hash': 'legacy_indexed_hash', 'indexed_at': 'legacy_indexed_at'}}
+        ),
+        (
+            {'legacy_indexed_hash': {'$exists': True}},
+            {
+                '$rename': {
+                    'legacy_indexed_hash': f'indexed_hash.{legacy_granularity}',
+                    'legacy_indexed_at': f'indexed_at.{legacy_granularity}'
+                },
+                '$set': other_pending
+            }
+        ),
+    ]
+
+
+def ensure_index_state_schema(laws_collection, index_state_collection):
+    """
+    `laws` コレクションのインデックス状態が単位ごとの形式でない場合は移行します。
+
+    移行済みのバージョンは `index_state` コレクションに記録し、同じプロセスでは2回目以降は確認しません。
+
+    :param laws_collection: `laws` コレクション（pymongo）。
+    :param index_state_collection: `index_state` コレクション（pymongo）。
+    :return: None
+    """
+    global _schema_checked
+    if _schema_checked:
+        return
+    state = index_state_collection.find_one({'_id': INDEX_STATE_SCHEMA_ID}, {'version': 1}) or {}
+    if state.get('version', 0) < INDEX_STATE_SCHEMA_VERSION:
+        for query, update in index_state_migrations():
+            result = laws_collection.update_many(query, update)
+            print(f'インデックス状態の移行: {query} → {result.modified_count}件')
+        index_state_collection.update_one(
+            {'_id': INDEX_STATE_SCHEMA_ID},
+            {'$set': {'version': INDEX_STATE_SCHEMA_VERSION, 'migrated_at': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    _schema_checked = True
+
+
+async def ensure_index_state_schema_async(laws_collection, index_state_collection):
+    """
+    `ensure_index_state_schema` の非同期ドライバ（AsyncMongoClient）版。
+
+    :param laws_collection: `laws` コレクション（AsyncMongoClient）。
+    :param index_state_collection: `index_state` コレクション（AsyncMongoClient）。
+    :return: None
+    """
+    global _schema_checked
+    if _schema_checked:
+        return
+    state = await index_state_collection.find_one({'_id': INDEX_STATE_SCHEMA_ID}, {'version': 1}) or {}
+    if state.get('version', 0) < INDEX_STATE_SCHEMA_VERSION:
+        for query, update in index_state_migrations():
+            await laws_collection.update_many(query, update)
+        await index_state_collection.update_one(
+            {'_id': INDEX_STATE_SCHEMA_ID},
+            {'$set': {'version': INDEX_STATE_SCHEMA_VERSION, 'migrated_at': datetime.now(timezone.utc)}},
+            upsert=True
+        )
+    _schema_checked = True
@@ -0,0 +1,183 @@
+import gzip
+import traceback
+from datetime import datetime, timezone
+from law_common.xml_storage import decode_xml_content
+
+try:
+    import zstandard
+except ImportError:  # zstdは任意の依存ライブラリ
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:  # 解析結果のキャッシュは任意の依存ライブラリ
+    msgpack = None
+
+# 解析結果（laws_parsed コレクション）の形式。lambda_indexが書き込み、APIが読み込みます
+PARSED_LAW_VERSION = 1  # 解析結果の形式のバージョン（抽出する項目を変更した場合に上げると、キャッシュが作り直されます）
+PARSED_CODEC_AVAILABLE = msgpack is not None  # 解析結果のシリアライズに必要な msgpack がインストールされているか
+
+
+def parse_law_structure(parser, xml_content, xml_format=None):
+    """
+    法律XMLを解析し、インデックスとAPIで使用する項目だけを取り出した解析結果を作成します。
+
+    :param parser: 法律XMLコンテンツを解析するために使用するパーサのインスタンス。
+    :param xml_content: 法律XMLコンテンツ（文字列またはバイト列）。
+    :param xml_format: `xml_content` の保存形式（'raw'、'gzip'、'zstd'）。Noneの場合は 'raw' として扱います。
+    :return: 'law_num'、'law_title'、'enact_statement'、'main_provision'、'sections'（`extract_sections` の結果）を含む辞書。
+    :raises ValueError: XMLを解析できなかった場合（理由は `parse_law_xml` を参照）、または解析された法律にlaw_bodyが含まれていない場合。
+    """
+    law = parse_law_xml(parser, decode_xml_content(xml_content, xml_format))
+
+    if not hasattr(law, 'law_body'):
+        raise ValueError("解析された法律にはlaw_bodyが含まれていません")
+
+    return {
+        "law_num": law.law_num,
+        "law_title": text_or_none(law.law_body.law_title),
+        "enact_statement": text_or_none(law.law_body.enact_statement),
+        "main_provision": texts_or_none(law.law_body.main_provision),
+        "sections": extract_sections(law)
+    }
+
+
+def parse_law_xml(parser, xml_string):
+    """
+    法律のXML文字列を解析します。
+
+    :param parser: 提供されたXML文字列を解析するパーサオブジェクト。
+    :type parser: object
+    :param xml_string: 解析する必要があるXMLコンテンツ（文字列またはバイト列）。
+    :type xml_string: str or bytes
+    :return: パーサの解析メソッドの結果。
+    :rtype: object
+    :raises ValueError: 解析に失敗した場合。メッセージは元の例外の種類と内容（'XMLSyntaxError: ...' など）で、
+        lambda_indexはこれを `laws_failed` コレクションに理由として記録します。
+    """
+    try:
+        if isinstance(xml_string, str):
+            xml_string = xml_string.encode('utf-8')
+        return parser.parse_from(xml_string)
+    except Exception as e:
+        raise ValueError(f"{type(e).__name__}: {e}") from e
+
+
+def extract_sections(law):
+    """
+    解析済みの法律から、本則の条ごとの見出し・条名・本文と、章などの階層を抽出します。
+
+    :param law: `LawParser` で解析した法律オブジェクト。
+    :return: 'article_num'、'article_caption'、'article_title'、'chapter_path'、'text' を含む辞書のリスト。
+    """
+    sections = []
+
+    def walk(node, path):
+        for article in getattr(node, 'articles', None) or []:
+            sections.append({
+                'article_num': article.num,
+                'article_caption': article.article_caption.text if article.article_caption else None,
+                'article_title': article.article_title.text if article.article_title_raw is not None else None,
+                'chapter_path': path,
+                'text': " ".join(text for paragraph in article.paragraphs for text in paragraph.texts())
+            })
+        for attribute, title_attribute in (
+            ('parts', 'part_title'), ('chapters', 'chapter_title'), ('sections', 'section_title'),
+            ('subsections', 'subsection_title'), ('divisions', 'division_title')
+        ):
+            for child in getattr(node, attribute, None) or []:
+                title = getattr(child, title_attribute, None)
+                walk(child, path + [title.text if title is not None else child.num])
+
+    main_provision = law.law_body.main_provision
+    walk(main_provision, [])
+    if not sections:
+        # 条の無い法令は本則の項を条文として扱う
+        for paragraph in main_provision.paragraphs or []:
+            sections.append({
+                'article_num': None,
+                'article_caption': None,
+                'article_title': None,
+                'chapter_path': [],
+                'text': " ".join(paragraph.texts())
+            })
+    return sections
+
+
+def text_or_none(obj):
+    """
+    オブジェクトの 'text' 属性を返します。
+
+    :param obj: 'text' 属性を持つ可能性のある入力オブジェクト
+    :return: オブジェクトの 'text' 属性（存在する場合）、存在しない場合はNone
+    """
+    try:
+        if obj is None:
+            return None
+        return obj.text
+    except Exception as e:
+        print(f"text_or_none内のエラー: {str(e)}")
+        print(f"トレースバック: {traceback.format_exc()}")
+        return None
+
+
+def texts_or_none(obj):
+    """
+    'texts' メソッドを持つオブジェクトのテキストを空白で結合して返します。
+
+    :param obj: 'texts' メソッドを持つオブジェクト。
+    :return: オブジェクトの 'texts' メソッドからのテキストを空白で結合した文字列、またはNone（オブジェクトがNoneまたはエラーが発生した場合）。
+    """
+    try:
+        if obj is None:
+            return None
+        return " ".join(obj.texts())
+    except Exception as e:
+        print(f"texts_or_none内のエラー: {str(e)}")
+        print(f"トレースバック: {traceback.format_exc()}")
+        return None
+
+
+def encode_parsed_law(law_id, content_hash, parsed):
+    """
+    法令の解析結果をmsgpackでシリアライズして圧縮し、`laws_parsed` コレクションのエントリを作成します。
+
+    :param law_id: 法令ID。
+    :param content_hash: 解析したXMLの `content_hash`（エントリのキー）。
+    :param parsed: `parse_law_structure` の結果。
+    :return: `laws_parsed` コレクションのドキュメント。
+    """
+    data = msgpack.packb(parsed, use_bin_type=True)
+    if zstandard is not None:
+        codec, data = 'msgpack+zstd', zstandard.ZstdCompressor(level=3).compress(data)
+    else:
+        codec, data = 'msgpack+gzip', gzip.compress(data, compresslevel=6)
+    return {
+        '_id': content_hash,
+        'law_id': law_id,
+        'version': PARSED_LAW_VERSION,
+        'codec': codec,
+        'data': data,
+        'created_at': datetime.now(timezone.utc)
+    }
+
+
+def decode_parsed_law(entry):
+    """
+    `laws_parsed` コレクションのエントリから法令の解析結果を復元します。
+
+    :param entry: `encode_parsed_law` で作成したドキュメント。
+    :return: `parse_law_structure` の結果と同じ形式の辞書。
+    :raises ValueError: 未対応の形式の場合。
+    """
+    codec = entry.get('codec')
+    data = bytes(entry['data'])
+    if codec == 'msgpack+zstd':
+        if zstandard is None:
+            raise ValueError("zstd形式の展開にはzstandardが必要です")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'msgpack+gzip':
+        data = gzip.decompress(data)
+    else:
+        raise ValueError(f"未対応の解析結果の形式です: {codec}")
+    return msgpack.unpackb(data, raw=False)
@@ -0,0 +1,78 @@
+from pymongo import ASCENDING
+from law_common.index_state import DEFAULT_INDEX_GRANULARITY, INDEX_GRANULARITIES, pending_field
+
+PARTITION_KEY = 'law_id'  # パーティション分割に使用するキー（インデックス付き）
+
+# パーティションの計画で走査するインデックス（キー、create_indexのオプション）。差分インデックスの対象は単位ごとの部分インデックス
+PARTITION_INDEXES = (
+    ([(PARTITION_KEY, ASCENDING)], {}),
+    *(
+        (
+            [(PARTITION_KEY, ASCENDING)],
+            {'name': f'law_id_index_pending_{granularity}', 'partialFilterExpression': {pending_field(granularity): True}}
+        )
+        for granularity in INDEX_GRANULARITIES
+    ),
+)
+
+
+def partition_query(incremental=False, granularity=DEFAULT_INDEX_GRANULARITY):
+    """
+    パーティションの境界キーを求めるために走査するクエリを返します。
+
+    同期（pymongo）・非同期（AsyncMongoClient）のどちらのドライバでも
+    `collection.find(query, projection).sort(sort)` として使用できます。
+
+    :param incremental: 真の場合、`granularity` の前回のインデックス後に内容が変更された法令（`index_pending.<granularity>`）のみを対象にします。
+    :param granularity: インデックスの単位（'law' または 'article'）。
+    :return: クエリ、プロジェクション、ソート順のタプル。
+    """
+    query = {pending_field(granularity): True} if incremental else {}
+    return query, {PARTITION_KEY: 1, '_id': 0}, [(PARTITION_KEY, ASCENDING)]
+
+
+class PartitionPlanner:
+    """
+    `law_id` のキー範囲でコレクションを分割するパーティションを計画します。
+
+    `partition_query` の結果を昇順に1回走査しながら `add` にドキュメントを渡し、`partition_size` 件ごとの境界キーを記録します。
+    各パーティションは `{'gte': 開始キー, 'lt': 終了キー}` の半開区間で表され、先頭の `gte` と末尾の `lt` は
+    `None`（下限・上限なし）になるため、実行中に追加されたドキュメントも漏れなくいずれかの範囲に含まれます。
+    """
+
+    def __init__(self, partition_size, incremental=False):
+        """
+        :param partition_size: 1パーティションあたりのドキュメント数の目安。
+        :param incremental: 各パーティションに記録する差分インデックスのフラグ。
+        """
+        self.partition_size = partition_size
+        self.incremental = incremental
+        self.boundaries = []
+        self.count = 0
+
+    def add(self, document):
+        """
+        走査したドキュメントを1件追加します。
+
+        :param document: `partition_query` のプロジェクションで取得したドキュメント。
+        """
+        if self.count % self.partition_size == 0:
+            self.boundaries.append(document.get(PARTITION_KEY))
+        self.count += 1
+
+    def partitions(self):
+        """
+        記録した境界キーからパーティションを作成します。
+
+        :return: パーティションを表す辞書のリスト（ドキュメントが存在しない場合は空のリスト）と、対象のドキュメント数のタプル。
+        """
+        boundaries = self.boundaries
+        partitions = [
+            {
+                'gte': boundaries[i] if i > 0 else None,
+                'lt': boundaries[i + 1] if i + 1 < len(boundaries) else None,
+                'incremental': self.incremental
+            }
+            for i in range(len(boundaries))
+        ]
+        return partitions, self.count
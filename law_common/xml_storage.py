@@ -0,0 +1,55 @@
+import gzip
+
+try:
+    import zstandard
+except ImportError:  # zstdは任意の依存ライブラリ
+    zstandard = None
+
+XML_STORAGE_FORMATS = ('raw', 'gzip', 'zstd')  # xml_contentの保存形式（laws コレクションの xml_format フィールド）
+ZSTD_AVAILABLE = zstandard is not None  # zstd形式で保存・展開できるかどうか
+
+
+def encode_xml_content(xml_data, xml_format):
+    """
+    XMLのバイト列を指定された保存形式に変換します。
+
+    'zstd' が指定されていても `zstandard` がインストールされていない場合は 'gzip' で保存します。
+
+    :param xml_data: XMLのバイト列。
+    :param xml_format: 保存形式（'raw'、'gzip'、'zstd'）。
+    :return: 保存する値と実際の保存形式のタプル。
+    :raises ValueError: 未対応の保存形式が指定された場合。
+    """
+    if xml_format == 'zstd' and zstandard is None:
+        print("zstandardがインストールされていないため、gzipで保存します")
+        xml_format = 'gzip'
+
+    if xml_format == 'raw':
+        return xml_data, xml_format
+    if xml_format == 'gzip':
+        return gzip.compress(xml_data), xml_format
+    if xml_format == 'zstd':
+        return zstandard.ZstdCompressor().compress(xml_data), xml_format
+    raise ValueError(f"未対応の保存形式です: {xml_format}")
+
+
+def decode_xml_content(xml_content, xml_format):
+    """
+    保存形式に応じて `xml_content` をXMLのバイト列に戻します。
+
+    :param xml_content: 保存されている値（文字列またはバイト列）。
+    :param xml_format: 保存形式（'raw'、'gzip'、'zstd'）。Noneの場合は 'raw' として扱います。
+    :return: XMLのバイト列。
+    :raises ValueError: 未対応の保存形式の場合。
+    """
+    if isinstance(xml_content, str):
+        return xml_content.encode('utf-8')
+    if xml_format in (None, 'raw'):
+        return bytes(xml_content)
+    if xml_format == 'gzip':
+        return gzip.decompress(xml_content)
+    if xml_format == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd形式の展開にはzstandardが必要です")
+        return zstandard.ZstdDecompressor().decompress(xml_content)
+    raise ValueError(f"未対応の保存形式です: {xml_format}")
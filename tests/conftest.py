@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 各サービスのイメージと同じく、サービスのモジュール（`app`、`index` など）と `law_common` を直接インポートできるようにする
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'api'), os.path.join(ROOT, 'lambda_index')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+import app
+from app import normalize_article_num
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('709', '709'),
+    ('７０９', '709'),
+    ('第709条', '709'),
+    ('709_2', '709_2'),
+    ('709の2', '709_2'),
+    ('第709条の2', '709_2'),
+    ('709-2-3', '709_2_3'),
+    (' 709 ', '709'),
+])
+def test_normalize_article_num(value, expected):
+    assert normalize_article_num(value) == expected
+
+
+@pytest.mark.parametrize('value', ['', '第条', 'abc', '709_', '_2', '七百九'])
+def test_normalize_article_num_rejects_invalid(value):
+    assert normalize_article_num(value) is None
+
+
+class FakeCollection:
+    """`find_one` だけを持つ、`law_id` で文書を返すコレクション。"""
+
+    def __init__(self, documents):
+        self.documents = {document['law_id']: document for document in documents}
+
+    async def find_one(self, query, projection=None):
+        document = self.documents.get(query.get('law_id'))
+        return dict(document) if document else None
+
+
+@pytest.fixture
+def laws(monkeypatch):
+    async def no_parsed_laws(content_hashes):
+        return {}
+
+    async def no_generation_check():
+        pass
+
+    monkeypatch.setattr(app, 'collection', FakeCollection([
+        {'law_id': 'BROKEN', 'law_title': '解析できない法令', 'content_hash': 'h1', 'xml_content': b'<Law><broken'},
+        {'law_id': 'NOXML', 'law_title': 'XMLの無い法令', 'content_hash': 'h2'},
+    ]))
+    monkeypatch.setattr(app, 'fetch_parsed_laws', no_parsed_laws)
+    monkeypatch.setattr(app, 'refresh_cache_generation', no_generation_check)
+    monkeypatch.setattr(app, 'sections_cache', type(app.sections_cache)())
+
+
+def get(path):
+    async def request():
+        response = await app.app.test_client().get(path)
+        return response.status_code, await response.get_json()
+    return asyncio.run(request())
+
+
+def test_invalid_article_num_returns_400():
+    status, _ = get('/laws/LAW1/articles/abc')
+    assert status == 400
+
+
+@pytest.mark.parametrize('path', [
+    '/laws/BROKEN/articles/1',
+    '/laws/BROKEN/articles',
+    '/laws/NOXML/articles/1',
+    '/search/by-id?law_id=BROKEN&fields=sections',
+])
+def test_unparsable_xml_returns_500_and_is_not_cached(laws, path):
+    status, body = get(path)
+    assert status == 500
+    assert body == {'error': 'XMLを解析できません'}
+    assert len(app.sections_cache) == 0
+
+
+def test_missing_law_returns_404(laws):
+    status, _ = get('/laws/MISSING/articles/1')
+    assert status == 404
@@ -0,0 +1,82 @@
+import asyncio
+
+import cache
+from cache import NullCache, ResponseCache, make_cache_key, normalize_query
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_get_and_set():
+    response_cache = ResponseCache(max_entries=4, max_bytes=1024, ttl_seconds=60)
+    run(response_cache.set('a', b'1'))
+    assert run(response_cache.get('a')) == b'1'
+    assert run(response_cache.get('b')) is None
+    stats = response_cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['bytes']) == (1, 1, 1, 1)
+
+
+def test_evicts_least_recently_used_entry():
+    response_cache = ResponseCache(max_entries=2, max_bytes=1024, ttl_seconds=60)
+    run(response_cache.set('a', b'1'))
+    run(response_cache.set('b', b'2'))
+    run(response_cache.get('a'))  # 'a' を最近参照したエントリにする
+    run(response_cache.set('c', b'3'))
+    assert run(response_cache.get('b')) is None
+    assert run(response_cache.get('a')) == b'1'
+    assert run(response_cache.get('c')) == b'3'
+    assert response_cache.stats()['evictions'] == 1
+
+
+def test_evicts_by_total_bytes():
+    response_cache = ResponseCache(max_entries=10, max_bytes=5, ttl_seconds=60)
+    run(response_cache.set('a', b'123'))
+    run(response_cache.set('b', b'456'))
+    assert run(response_cache.get('a')) is None
+    assert response_cache.stats()['bytes'] == 3
+
+
+def test_overwrite_updates_byte_count():
+    response_cache = ResponseCache(max_entries=10, max_bytes=1024, ttl_seconds=60)
+    run(response_cache.set('a', b'123'))
+    run(response_cache.set('a', b'1'))
+    assert response_cache.stats()['bytes'] == 1
+
+
+def test_skips_entries_larger_than_max_entry_bytes():
+    response_cache = ResponseCache(max_entries=10, max_bytes=1024, ttl_seconds=60, max_entry_bytes=2)
+    run(response_cache.set('a', b'123'))
+    assert run(response_cache.get('a')) is None
+
+
+def test_expires_entries_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    response_cache = ResponseCache(max_entries=10, max_bytes=1024, ttl_seconds=5)
+    run(response_cache.set('a', b'1'))
+    now[0] = 104.0
+    assert run(response_cache.get('a')) == b'1'
+    now[0] = 106.0
+    assert run(response_cache.get('a')) is None
+    stats = response_cache.stats()
+    assert (stats['expirations'], stats['entries'], stats['bytes']) == (1, 0, 0)
+
+
+def test_clear():
+    response_cache = ResponseCache(max_entries=10, max_bytes=1024, ttl_seconds=60)
+    run(response_cache.set('a', b'1'))
+    run(response_cache.clear())
+    assert run(response_cache.get('a')) is None
+    assert response_cache.stats()['invalidations'] == 1
+
+
+def test_null_cache_stores_nothing():
+    null_cache = NullCache()
+    run(null_cache.set('a', b'1'))
+    assert run(null_cache.get('a')) is None
+
+
+def test_cache_key_normalization():
+    assert normalize_query('  ＡＢＣ　個人情報 ') == 'abc 個人情報'
+    assert make_cache_key('by-id', law_id='x', fields='meta') == make_cache_key('by-id', fields='meta', law_id='x')
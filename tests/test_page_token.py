@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+import app
+from app import SEARCH_MAX_RESULT_WINDOW, SEARCH_MAX_SIZE, decode_page_token, encode_page_token
+
+
+@pytest.mark.parametrize('page', [
+    {'q': '個人情報', 'g': 'law', 'size': 10, 'sa': [12.5, 'LAW1'], 'pit': 'pit-id'},
+    {'q': 'a', 'g': 'article', 'size': 1, 'from': 20},
+])
+def test_round_trip(page):
+    token = encode_page_token(page)
+    assert '=' not in token
+    assert decode_page_token(token) == page
+
+
+@pytest.mark.parametrize('page', [
+    ['q'],
+    {'g': 'law', 'size': 10},
+    {'q': 'a', 'g': 'other', 'size': 10},
+    {'q': 'a', 'g': 'law', 'size': 0},
+    {'q': 'a', 'g': 'law', 'size': SEARCH_MAX_SIZE + 1},
+    {'q': 'a', 'g': 'law', 'size': True},
+    {'q': 'a', 'g': 'article', 'size': 10, 'from': '10'},
+    {'q': 'a', 'g': 'article', 'size': 10, 'from': -1},
+    {'q': 'a', 'g': 'article', 'size': 10, 'from': SEARCH_MAX_RESULT_WINDOW},
+    {'q': 'a', 'g': 'law', 'size': 10, 'sa': 'LAW1'},
+    {'q': 'a', 'g': 'law', 'size': 10, 'pit': 1},
+])
+def test_rejects_invalid_page(page):
+    with pytest.raises(ValueError):
+        decode_page_token(encode_page_token(page))
+
+
+@pytest.mark.parametrize('token', ['!!!', 'bm90IGpzb24'])
+def test_rejects_malformed_token(token):
+    with pytest.raises(ValueError):
+        decode_page_token(token)
+
+
+def test_parse_search_size():
+    assert app.parse_search_size(None) == app.SEARCH_DEFAULT_SIZE
+    assert app.parse_search_size('5') == 5
+    for value in ('0', str(SEARCH_MAX_SIZE + 1), 'x'):
+        with pytest.raises(ValueError):
+            app.parse_search_size(value)
+
+
+def test_parse_track_total_hits():
+    assert app.parse_track_total_hits(None) == app.SEARCH_TRACK_TOTAL_HITS
+    assert app.parse_track_total_hits('TRUE') is True
+    assert app.parse_track_total_hits('-5') == 0
+    with pytest.raises(ValueError):
+        app.parse_track_total_hits('x')
+
+
+def test_invalid_token_returns_400():
+    token = encode_page_token({'q': 'a', 'g': 'article', 'size': 10, 'from': 'x'})
+
+    async def request():
+        response = await app.app.test_client().get(f'/search/by-query?page_token={token}')
+        return response.status_code
+
+    assert asyncio.run(request()) == 400
+
+
+def test_deletes_pit_when_first_page_fails(monkeypatch):
+    deleted = []
+
+    class FakeOpenSearch:
+        async def create_pit(self, **kwargs):
+            return {'pit_id': 'pit-id'}
+
+        async def delete_pit(self, body):
+            deleted.append(body['pit_id'])
+
+    async def failing_search_page(*args):
+        raise RuntimeError('search failed')
+
+    monkeypatch.setattr(app, 'client', FakeOpenSearch())
+    monkeypatch.setattr(app, 'search_page', failing_search_page)
+
+    async def request():
+        response = await app.app.test_client().get('/search/by-query?query=a&pit=true')
+        return response.status_code
+
+    assert asyncio.run(request()) == 500
+    assert deleted == [['pit-id']]
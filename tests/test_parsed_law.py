@@ -0,0 +1,68 @@
+import gzip
+
+import pytest
+from ja_law_parser.parser import LawParser
+
+from law_common import parsed_law
+from law_common.parsed_law import (PARSED_LAW_VERSION, decode_parsed_law, encode_parsed_law, parse_law_structure,
+                                   parse_law_xml)
+from law_common.xml_storage import encode_xml_content
+
+LAW_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<Law Era="Showa" Year="29" Num="1" LawType="Act" Lang="ja" PromulgateMonth="4" PromulgateDay="1">
+<LawNum>昭和二十九年法律第一号</LawNum>
+<LawBody><LawTitle Kana="てすとほう">テスト法</LawTitle><EnactStatement>ここに制定する。</EnactStatement>
+<MainProvision><Chapter Num="1"><ChapterTitle>第一章　総則</ChapterTitle>
+<Article Num="1"><ArticleCaption>（目的）</ArticleCaption><ArticleTitle>第一条</ArticleTitle>
+<Paragraph Num="1"><ParagraphNum/><ParagraphSentence><Sentence Num="1">この法律は目的を定める。</Sentence></ParagraphSentence></Paragraph>
+</Article>
+<Article Num="1_2"><ArticleTitle>第一条の二</ArticleTitle>
+<Paragraph Num="1"><ParagraphNum/><ParagraphSentence><Sentence Num="1">枝番号の条である。</Sentence></ParagraphSentence></Paragraph>
+</Article>
+</Chapter></MainProvision></LawBody></Law>'''
+
+
+@pytest.fixture(scope='module')
+def parsed():
+    return parse_law_structure(LawParser(), LAW_XML.encode('utf-8'))
+
+
+def test_parse_law_structure(parsed):
+    assert parsed['law_title'] == 'テスト法'
+    assert parsed['enact_statement'] == 'ここに制定する。'
+    assert [section['article_num'] for section in parsed['sections']] == ['1', '1_2']
+    first = parsed['sections'][0]
+    assert first['article_caption'] == '（目的）'
+    assert first['chapter_path'] == ['第一章　総則']
+    assert 'この法律は目的を定める。' in first['text']
+
+
+@pytest.mark.parametrize('xml_format', ['raw', 'gzip', 'zstd'])
+def test_parse_law_structure_from_stored_format(parsed, xml_format):
+    xml_content, stored_format = encode_xml_content(LAW_XML.encode('utf-8'), xml_format)
+    assert parse_law_structure(LawParser(), xml_content, stored_format) == parsed
+
+
+def test_parse_failure_keeps_original_exception():
+    with pytest.raises(ValueError, match=r'^\w+Error: '):
+        parse_law_xml(LawParser(), b'<Law><broken')
+
+
+def test_round_trip(parsed):
+    entry = encode_parsed_law('LAW1', 'hash1', parsed)
+    assert (entry['_id'], entry['law_id'], entry['version']) == ('hash1', 'LAW1', PARSED_LAW_VERSION)
+    assert decode_parsed_law(entry) == parsed
+
+
+def test_round_trip_with_gzip(monkeypatch, parsed):
+    monkeypatch.setattr(parsed_law, 'zstandard', None)
+    entry = encode_parsed_law('LAW1', 'hash1', parsed)
+    assert entry['codec'] == 'msgpack+gzip'
+    assert gzip.decompress(entry['data'])
+    assert decode_parsed_law(entry) == parsed
+
+
+def test_decode_rejects_unknown_codec(parsed):
+    entry = dict(encode_parsed_law('LAW1', 'hash1', parsed), codec='pickle')
+    with pytest.raises(ValueError):
+        decode_parsed_law(entry)
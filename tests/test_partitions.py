@@ -0,0 +1,41 @@
+from law_common.partitions import PARTITION_KEY, PartitionPlanner, partition_query
+
+
+def plan(law_ids, partition_size, incremental=False):
+    planner = PartitionPlanner(partition_size, incremental)
+    for law_id in law_ids:
+        planner.add({PARTITION_KEY: law_id})
+    return planner.partitions()
+
+
+def test_no_documents():
+    assert plan([], 2) == ([], 0)
+
+
+def test_boundaries_every_partition_size():
+    partitions, count = plan(['L0', 'L1', 'L2', 'L3', 'L4'], 2)
+    assert count == 5
+    assert [(p['gte'], p['lt']) for p in partitions] == [(None, 'L2'), ('L2', 'L4'), ('L4', None)]
+
+
+def test_exact_multiple_does_not_add_empty_partition():
+    partitions, count = plan(['L0', 'L1', 'L2', 'L3'], 2)
+    assert count == 4
+    assert [(p['gte'], p['lt']) for p in partitions] == [(None, 'L2'), ('L2', None)]
+
+
+def test_single_partition_is_unbounded():
+    """先頭と末尾は上限・下限なしにして、計画後に追加された法令も漏らさない"""
+    partitions, _ = plan(['L0', 'L1'], 10)
+    assert partitions == [{'gte': None, 'lt': None, 'incremental': False}]
+
+
+def test_incremental_flag_is_recorded():
+    partitions, _ = plan(['L0', 'L1', 'L2'], 1, incremental=True)
+    assert all(p['incremental'] for p in partitions)
+
+
+def test_partition_query():
+    assert partition_query() == ({}, {PARTITION_KEY: 1, '_id': 0}, [(PARTITION_KEY, 1)])
+    query, _, _ = partition_query(incremental=True, granularity='article')
+    assert query == {'index_pending.article': True}
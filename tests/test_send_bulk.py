@@ -0,0 +1,80 @@
+import pytest
+
+import index
+
+
+@pytest.fixture
+def fake_bulk(monkeypatch):
+    """
+    ドキュメントIDごとに試行ごとのステータスを指定できる `bulk_results` の代わり。
+    各呼び出しのバッチの上限とドキュメントIDを `calls` に記録します。
+    """
+    statuses = {}
+    calls = []
+
+    def bulk_results(client, actions, max_docs, max_bytes, thread_count):
+        actions = list(actions)
+        calls.append({'max_docs': max_docs, 'max_bytes': max_bytes, 'threads': thread_count,
+                      'ids': [action['_id'] for action in actions]})
+        for action in actions:
+            pending = statuses.get(action['_id'])
+            status = pending.pop(0) if pending else 201
+            item = {'_id': action['_id'], 'status': status}
+            if status >= 300:
+                item['error'] = {'type': 'es_rejected_execution_exception' if status == 429 else 'mapper_parsing_exception',
+                                 'reason': 'test'}
+            yield status < 300, {'index': item}
+
+    monkeypatch.setattr(index, 'bulk_results', bulk_results)
+    monkeypatch.setattr(index, 'BULK_MAX_RETRIES', 3)
+    monkeypatch.setattr(index.time, 'sleep', lambda seconds: None)
+    return statuses, calls
+
+
+def actions(*doc_ids):
+    return [{'_index': 'law-index', '_id': doc_id, '_source': {}} for doc_id in doc_ids]
+
+
+def test_all_succeed(fake_bulk):
+    _, calls = fake_bulk
+    indexed = []
+    assert index.send_bulk(actions('a', 'b'), 8, 1024, 2, on_indexed=indexed.append) == (2, 0)
+    assert indexed == ['a', 'b']
+    assert len(calls) == 1 and calls[0]['threads'] == 2
+
+
+def test_retryable_errors_are_resent_with_halved_batches(fake_bulk):
+    statuses, calls = fake_bulk
+    statuses['b'] = [429, 429]
+    indexed = []
+    assert index.send_bulk(actions('a', 'b', 'c'), 8, 1024, 2, on_indexed=indexed.append) == (3, 0)
+    assert sorted(indexed) == ['a', 'b', 'c']
+    # 1回目は通常の上限、再送は1スレッドで上限を半分ずつにする
+    assert [(call['max_docs'], call['max_bytes'], call['threads']) for call in calls] == [(8, 1024, 2), (4, 512, 1), (2, 256, 1)]
+    assert calls[1]['ids'] == ['b'] and calls[2]['ids'] == ['b']
+
+
+def test_non_retryable_error_is_reported_without_resend(fake_bulk):
+    statuses, calls = fake_bulk
+    statuses['b'] = [400]
+    failed = []
+    assert index.send_bulk(actions('a', 'b'), 8, 1024, 1, on_failed=lambda doc_id, reason: failed.append(doc_id)) == (1, 1)
+    assert failed == ['b']
+    assert len(calls) == 1
+
+
+def test_gives_up_after_max_retries(fake_bulk):
+    statuses, calls = fake_bulk
+    statuses['a'] = [503] * 10
+    failed = []
+    assert index.send_bulk(actions('a'), 8, 1024, 1, on_failed=lambda doc_id, reason: failed.append((doc_id, reason))) == (0, 1)
+    assert len(calls) == 1 + index.BULK_MAX_RETRIES
+    assert failed[0][0] == 'a'
+
+
+def test_batch_limits_never_drop_below_one(fake_bulk):
+    statuses, calls = fake_bulk
+    statuses['a'] = [429, 429, 429]
+    index.send_bulk(actions('a'), 2, 2, 1)
+    assert [call['max_docs'] for call in calls] == [2, 1, 1, 1]
+    assert [call['max_bytes'] for call in calls] == [2, 1, 1, 1]
@@ -0,0 +1,54 @@
+from suggest import TitleIndex, normalize_prefix
+
+DOCUMENTS = [
+    {'law_id': '415AC0000000057', 'law_title': '個人情報の保護に関する法律', 'law_num': '平成十五年法律第五十七号',
+     'law_title_kana': 'こじんじょうほうのほごにかんするほうりつ', 'law_title_abbrevs': ['個人情報保護法']},
+    # 同じ題名の古い版（law_id が小さい）は候補にしない
+    {'law_id': '415AC0000000001', 'law_title': '個人情報の保護に関する法律', 'law_num': '古い版'},
+    {'law_id': '129AC0000000089', 'law_title': '民法', 'law_num': '明治二十九年法律第八十九号',
+     'law_title_kana': 'みんぽう'},
+    {'law_id': '140AC0000000045', 'law_title': '刑法', 'law_num': '明治四十年法律第四十五号', 'law_title_kana': 'けいほう'},
+    {'law_id': 'NOTITLE'},
+]
+
+
+def test_normalize_prefix():
+    assert normalize_prefix(' ミン ポウ ') == 'みんぽう'
+    assert normalize_prefix('ＡＢＣ') == 'abc'
+
+
+def test_index_keeps_latest_version_per_title():
+    index = TitleIndex(DOCUMENTS)
+    assert index.laws == 3
+    [suggestion] = index.search('個人情報の')
+    assert suggestion['law_id'] == '415AC0000000057'
+    assert suggestion['matched'] == 'title'
+
+
+def test_matches_abbrev_and_kana():
+    index = TitleIndex(DOCUMENTS)
+    assert index.search('個人情報保護')[0]['matched'] == 'abbrev'
+    # カタカナ・全角空白を含む入力も読みに一致する
+    [suggestion] = index.search('ミン　ポ')
+    assert (suggestion['law_title'], suggestion['matched'], suggestion['text']) == ('民法', 'kana', 'みんぽう')
+
+
+def test_each_law_is_returned_once():
+    index = TitleIndex(DOCUMENTS)
+    suggestions = index.search('個人情報')
+    assert [suggestion['law_id'] for suggestion in suggestions] == ['415AC0000000057']
+
+
+def test_matches_prefix_only():
+    assert TitleIndex(DOCUMENTS).search('法') == []
+
+
+def test_size_limit_and_order():
+    suggestions = TitleIndex([
+        {'law_id': f'L{number}', 'law_title': f'テスト法{"の" * number}'} for number in range(5)
+    ]).search('テスト', size=3)
+    assert [suggestion['law_title'] for suggestion in suggestions] == ['テスト法', 'テスト法の', 'テスト法のの']
+
+
+def test_empty_prefix_returns_nothing():
+    assert TitleIndex(DOCUMENTS).search('  ') == []
@@ -0,0 +1,338 @@
+import os
+import sys
+import io
+import json
+import gzip
+import argparse
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:  # .jsonl.zst の読み書きにのみ必要（無い場合は .jsonl.gz を使用）
+    zstandard = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# スナップショットの設定
+SNAPSHOT_FORMAT_VERSION = 1  # スナップショットファイルの形式のバージョン
+SNAPSHOT_SCAN_SIZE = int(os.getenv('SNAPSHOT_SCAN_SIZE', 1000))  # OpenSearchからのエクスポートで1回のスクロールで取得する件数
+SNAPSHOT_SCROLL = os.getenv('SNAPSHOT_SCROLL', '5m')  # スクロールのコンテキストを保持する時間
+SNAPSHOT_ZSTD_LEVEL = int(os.getenv('SNAPSHOT_ZSTD_LEVEL', 10))  # zstdの圧縮レベル
+GRANULARITIES = ['law', 'article']
+
+
+def main(argv=None):
+    """
+    インデックス済みのドキュメントのエクスポート・インポートを実行します。
+
+    :param argv: コマンドライン引数（Noneの場合は `sys.argv`）。
+    :return: 終了コード。
+    """
+    args = parse_args(argv)
+    index = load_index_module()
+    with redirect_stdout(sys.stderr):
+        if args.command == 'export':
+            summary = export_snapshot(index, args.output, args.source, args.granularity)
+        else:
+            summary = import_snapshot(
+                index, args.input, args.granularity, not args.no_mark_indexed, args.force_merge_segments
+            )
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0 if summary.get('complete', True) and not summary.get('failed') else 1
+
+
+def parse_args(argv=None):
+    """
+    コマンドライン引数を解析します。
+
+    :param argv: コマンドライン引数（Noneの場合は `sys.argv`）。
+    :return: 解析結果の `argparse.Namespace`。
+    """
+    parser = argparse.ArgumentParser(description='インデックス済みのドキュメントのスナップショット（JSONL.zst）のエクスポート・インポート')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help='ドキュメントをスナップショットファイルに書き出す')
+    export_parser.add_argument('--output', required=True, help='書き出すファイル（.jsonl.zst または .jsonl.gz）')
+    export_parser.add_argument('--source', choices=['opensearch', 'mongo'], default='opensearch',
+                               help='opensearch はインデックスをスクロール、mongo は解析結果のキャッシュからドキュメントを作成')
+    export_parser.add_argument('--granularity', type=split_granularities, default=['law'],
+                               help='書き出すインデックスの単位（カンマ区切り、law,article）')
+    import_parser = commands.add_parser('import', help='スナップショットファイルをOpenSearchにバルクロードする')
+    import_parser.add_argument('--input', required=True, help='読み込むファイル（.jsonl.zst または .jsonl.gz）')
+    import_parser.add_argument('--granularity', type=split_granularities, default=None,
+                               help='読み込むインデックスの単位（省略時はファイルに含まれるすべて）')
+    import_parser.add_argument('--no-mark-indexed', action='store_true',
+                               help='MongoDBの法令をインデックス済みとして記録しない')
+    import_parser.add_argument('--force-merge-segments', type=int, default=0,
+                               help='読み込み後にforce mergeするセグメント数（0はforce mergeしない）')
+    return parser.parse_args(argv)
+
+
+def split_granularities(value):
+    """
+    カンマ区切りのインデックスの単位を検証してリストにします。
+
+    :param value: 'law'、'article'、'law,article' などの文字列。
+    :return: インデックスの単位のリスト。
+    :raises argparse.ArgumentTypeError: 未対応の単位が含まれる場合。
+    """
+    granularities = [granularity for granularity in value.split(',') if granularity]
+    unknown = set(granularities) - set(GRANULARITIES)
+    if unknown or not granularities:
+        raise argparse.ArgumentTypeError(f"インデックスの単位は {','.join(GRANULARITIES)} から指定してください")
+    return granularities
+
+
+def load_index_module():
+    """
+    `lambda_index` の `index` モジュールを読み込みます（接続先は各サービスと同じ環境変数で設定します）。
+
+    :return: `index` モジュール。
+    """
+    # law_common パッケージ（リポジトリのルート）も読み込めるようにする
+    for path in (REPO_ROOT, os.path.join(REPO_ROOT, 'lambda_index')):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    with redirect_stdout(sys.stderr):
+        import index
+    return index
+
+
+def export_snapshot(index, path, source, granularities):
+    """
+    ドキュメントをスナップショットファイルに書き出します。
+
+    1行目はヘッダー（形式のバージョン、作成日時、アナライザのプロファイル、単位）、最終行は件数を含むフッターで、
+    その間の各行が1件のドキュメント（'granularity'、'_id'、'content_hash'、'_source'）です。
+    書き出しは一時ファイルに行い、完了後に名前を変更するため、途中で失敗しても不完全なファイルは残りません。
+
+    :param index: `index` モジュール。
+    :param path: 書き出すファイルのパス。
+    :param source: 'opensearch'（インデックスをスクロール）または 'mongo'（解析結果のキャッシュから作成）。
+    :param granularities: 書き出すインデックスの単位のリスト。
+    :return: 'output'、'source'、'documents'（単位ごとの件数）、'laws'、'skipped' を含む辞書。
+    """
+    counts = {granularity: 0 for granularity in granularities}
+    laws = set()
+    skipped = 0
+    temporary_path = f'{path}.partial'
+    with open_snapshot(temporary_path, 'w') as snapshot_file:
+        write_line(snapshot_file, {'snapshot': {
+            'version': SNAPSHOT_FORMAT_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'source': source,
+            'analyzer_profile': index.ANALYZER_PROFILE,
+            'granularities': granularities
+        }})
+        for granularity in granularities:
+            if source == 'opensearch':
+                documents = iter_opensearch_documents(index, granularity)
+            else:
+                documents = iter_mongo_documents(index, granularity)
+            for document in documents:
+                if document is None:
+                    skipped += 1
+                    continue
+                write_line(snapshot_file, document)
+                counts[granularity] += 1
+                laws.add(index.law_id_from_doc_id(document['_id']))
+            print(f'{granularity}: {counts[granularity]}件を書き出しました')
+        write_line(snapshot_file, {'snapshot_end': {'documents': counts}})
+    os.replace(temporary_path, path)
+    return {'output': path, 'source': source, 'documents': counts, 'laws': len(laws), 'skipped': skipped}
+
+
+def iter_opensearch_documents(index, granularity):
+    """
+    インデックスのすべてのドキュメントをスクロールで取得します。
+
+    法令ごとのドキュメントには `content_hash` が含まれないため、MongoDBのインデックス済みのハッシュ値（`indexed_hash.law`）を付加します。
+
+    :param index: `index` モジュール。
+    :param granularity: インデックスの単位。
+    :return: スナップショットの行の辞書を返すジェネレータ。
+    """
+    alias = index.ARTICLE_INDEX_NAME if granularity == 'article' else index.INDEX_NAME
+    indexed_hashes = {}
+    if granularity == 'law':
+        indexed_hashes = {
+            document['law_id']: (document.get('indexed_hash') or {}).get('law')
+            for document in index.collection.find({'indexed_hash.law': {'$exists': True}}, {'law_id': 1, 'indexed_hash': 1, '_id': 0})
+        }
+    hits = index.helpers.scan(
+        index.clientOpenSearch,
+        index=alias,
+        query={'query': {'match_all': {}}, 'sort': ['_doc']},
+        size=SNAPSHOT_SCAN_SIZE,
+        scroll=SNAPSHOT_SCROLL
+    )
+    for hit in hits:
+        source = hit['_source']
+        yield {
+            'granularity': granularity,
+            '_id': hit['_id'],
+            'content_hash': source.get('content_hash') or indexed_hashes.get(index.law_id_from_doc_id(hit['_id'])),
+            '_source': source
+        }
+
+
+def iter_mongo_documents(index, granularity):
+    """
+    MongoDBの法令から、`lambda_index` と同じ形式のドキュメントを作成します。
+
+    解析結果のキャッシュ（`laws_parsed`）がある法令はXMLを解析せずに作成し、無い法令のみXMLを解析します。
+
+    :param index: `index` モジュール。
+    :param granularity: インデックスの単位。
+    :return: スナップショットの行の辞書（作成できなかった法令はNone）を返すジェネレータ。
+    """
+    parser = index.get_parser()
+    items = index.attach_parsed_laws(index.collection.find({}, {'xml_content': 0}).sort('law_id', 1))
+    for item in items:
+        try:
+            index_data, _, _ = index.process_law(parser, item, granularity)
+        except Exception as e:
+            print(f"ドキュメントを作成できませんでした: {item.get('law_id')} {e}")
+            yield None
+            continue
+        for action in index_data if isinstance(index_data, list) else [index_data]:
+            yield {
+                'granularity': granularity,
+                '_id': action['_id'],
+                'content_hash': item.get('content_hash'),
+                '_source': action['_source']
+            }
+
+
+def import_snapshot(index, path, granularities=None, mark_indexed=True, force_merge_segments=0):
+    """
+    スナップショットファイルのドキュメントを、XMLを解析せずにOpenSearchへバルクロードします。
+
+    読み込みの間はインデックスをバルクロード用の設定（リフレッシュの停止、レプリカ数0）にし、完了後に元に戻します。
+    `mark_indexed` が真の場合は、読み込んだ法令のうちMongoDBの `content_hash` がスナップショットと一致するものを
+    インデックス済みとして記録するため、その後の差分インデックスでは変更された法令だけが処理されます。
+
+    :param index: `index` モジュール。
+    :param path: 読み込むファイルのパス。
+    :param granularities: 読み込むインデックスの単位のリスト（Noneの場合はファイルに含まれるすべて）。
+    :param mark_indexed: 読み込んだ法令をMongoDBにインデックス済みとして記録するか。
+    :param force_merge_segments: 1以上の場合、読み込み後にセグメント数がこの値になるまでforce mergeします。
+    :return: 'input'、'documents'（単位ごとの件数）、'failed'、'laws'、'complete'（フッターまで読み込めたか）を含む辞書。
+    """
+    header = read_snapshot_header(path)
+    granularities = granularities or header['granularities']
+    if header.get('analyzer_profile') != index.ANALYZER_PROFILE:
+        print(f"スナップショットのアナライザ（{header.get('analyzer_profile')}）と ANALYZER_PROFILE（{index.ANALYZER_PROFILE}）が異なります。"
+              f"新しく作成するインデックスには ANALYZER_PROFILE が使用されます")
+
+    summary = {'input': path, 'documents': {}, 'failed': 0, 'laws': 0, 'complete': True}
+    for granularity in granularities:
+        content_hashes = {}
+        indexed_ids = set()
+        failed_ids = set()
+        footer = {}
+
+        def iter_actions():
+            alias = index.ARTICLE_INDEX_NAME if granularity == 'article' else index.INDEX_NAME
+            for line in iter_snapshot_lines(path):
+                if 'snapshot_end' in line:
+                    footer.update(line['snapshot_end'])
+                    continue
+                if line.get('granularity') != granularity:
+                    continue
+                content_hashes[index.law_id_from_doc_id(line['_id'])] = line.get('content_hash')
+                yield {'_index': alias, '_id': line['_id'], '_source': line['_source']}
+
+        index.begin_bulk_load(granularity)
+        try:
+            success_count, error_count = index.send_bulk(
+                iter_actions(), index.BULK_MAX_DOCS, index.BULK_MAX_BYTES, index.BULK_THREADS,
+                on_indexed=lambda doc_id: indexed_ids.add(index.law_id_from_doc_id(doc_id)),
+                on_failed=lambda doc_id, reason: failed_ids.add(index.law_id_from_doc_id(doc_id))
+            )
+        finally:
+            index.end_bulk_load(granularity, force_merge_segments)
+        print(f'{granularity}: 成功={success_count}, 失敗={error_count}')
+
+        indexed_ids -= failed_ids
+        if mark_indexed:
+            index.ensure_index_state_schema(index.collection, index.index_state_collection)
+            index.mark_indexed(
+                sorted(law_id for law_id in indexed_ids if content_hashes.get(law_id)), content_hashes, granularity
+            )
+        expected = footer.get('documents', {}).get(granularity)
+        summary['documents'][granularity] = success_count
+        summary['failed'] += error_count
+        summary['laws'] = max(summary['laws'], len(indexed_ids))
+        complete = bool(footer) and expected == success_count + error_count
+        summary['complete'] = summary['complete'] and complete
+        if not complete:
+            print(f"スナップショットが不完全です: {granularity} 期待={expected} 読み込み={success_count + error_count}")
+    index.bump_index_generation()
+    return summary
+
+
+def read_snapshot_header(path):
+    """
+    スナップショットファイルのヘッダーを読み込み、形式を検証します。
+
+    :param path: スナップショットファイルのパス。
+    :return: ヘッダーの辞書。
+    :raises ValueError: スナップショットファイルではない、または対応していないバージョンの場合。
+    """
+    header = next(iter_snapshot_lines(path), {}).get('snapshot')
+    if not header:
+        raise ValueError(f"スナップショットファイルではありません: {path}")
+    if header.get('version') != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"未対応のスナップショットのバージョンです: {header.get('version')}")
+    return header
+
+
+def iter_snapshot_lines(path):
+    """
+    スナップショットファイルの各行を辞書として返します。
+
+    :param path: スナップショットファイルのパス。
+    :return: 行の辞書を返すジェネレータ。
+    """
+    with open_snapshot(path, 'r') as snapshot_file:
+        for line in snapshot_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_line(snapshot_file, value):
+    """
+    1行のJSONを書き込みます。
+
+    :param snapshot_file: `open_snapshot` で開いたファイル。
+    :param value: 書き込む辞書。
+    :return: None
+    """
+    snapshot_file.write(json.dumps(value, ensure_ascii=False, default=str) + '\n')
+
+
+def open_snapshot(path, mode):
+    """
+    拡張子に応じて圧縮されたスナップショットファイルをテキストとして開きます（.zst はzstd、それ以外はgzip）。
+
+    :param path: ファイルのパス（書き込み時は '.partial' が付いていても元の拡張子で判定します）。
+    :param mode: 'r' または 'w'。
+    :return: テキストのファイルオブジェクト。
+    :raises RuntimeError: .zst のファイルで zstandard がインストールされていない場合。
+    """
+    name = path[:-len('.partial')] if path.endswith('.partial') else path
+    if name.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError('.zst のファイルには zstandard が必要です（.jsonl.gz を指定してください）')
+        raw = open(path, f'{mode}b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor(level=SNAPSHOT_ZSTD_LEVEL).stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    return gzip.open(path, f'{mode}t', encoding='utf-8')
+
+
+if __name__ == '__main__':
+    sys.exit(main())